@@ -20,10 +20,34 @@ import subprocess
 import argparse
 import json
 import re
+import tomllib
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import tempfile
 import shutil
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+_VERSION_RE = re.compile(r'^([ \t]*version[ \t]*=[ \t]*)"([^"]+)"', re.MULTILINE)
+# A line holding only a table header; _table_headers weeds out array lines that look like one
+_TABLE_HEADER_RE = re.compile(r'^[ \t]*\[\[?[ \t]*([A-Za-z0-9_.\-"\' ]+?)[ \t]*\]\]?[ \t]*(?:#.*)?\r?$', re.MULTILINE)
+_GH_URL_RE = re.compile(r'https://github\.com/[^"]+')
+
+def _table_headers(content: str) -> List[re.Match[str]]:
+    """Find the table headers in TOML contents.
+    
+    A line inside a multi-line array can look like a header (e.g. `["nested"]`); it is only
+    a header if everything before it is complete TOML.
+    """
+    headers = []
+    for match in _TABLE_HEADER_RE.finditer(content):
+        try:
+            tomllib.loads(content[:match.start()])
+        except tomllib.TOMLDecodeError:
+            continue
+        headers.append(match)
+    return headers
+
 
 class PyPIPublisher:
     def __init__(self, project_root: Path, github_url: Optional[str] = None):
@@ -31,23 +55,46 @@ class PyPIPublisher:
         self.github_url = github_url or "https://github.com/LukasNel/maximum_agents"
         self.pyproject_path = project_root / "pyproject.toml"
         self.readme_path = project_root / "README.md"
-        
+        self._pyproject_content: Optional[str] = None
+        
+    def _stream(self, cmd: List[str], prefix: str = "") -> Tuple[int, str]:
+        """Run a command, echoing its output live and keeping only a short tail.
+        
+        Args:
+            cmd: Command to run in the project root
+            prefix: Optional label prepended to each echoed line
+        
+        Returns:
+            Tuple of (return_code, last_lines_of_output)
+        """
+        process = subprocess.Popen(
+            cmd,
+            cwd=self.project_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        tail: collections.deque[str] = collections.deque(maxlen=200)
+        assert process.stdout is not None
+        for line in process.stdout:
+            print(prefix + line, end='')
+            tail.append(line)
+        return process.wait(), ''.join(tail)
+    
     def check_prerequisites(self) -> bool:
         """Check if all required tools are available."""
         print("🔍 Checking prerequisites...")
         
         required_tools = ["python", "pip", "twine"]
         missing_tools = []
-        subprocess.run(["pip3", "install", "twine"], capture_output=True, check=True)
         
         for tool in required_tools:
-            try:
-                subprocess.run([tool, "--version"], capture_output=True, check=True)
+            if shutil.which(tool):
                 print(f"✅ {tool} is available")
-            except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                print(f"❌ {tool} is missing: {e}")
-                missing_tools.append(tool)
+            else:
                 print(f"❌ {tool} is missing")
+                missing_tools.append(tool)
         
         if missing_tools:
             print(f"\n❌ Missing required tools: {', '.join(missing_tools)}")
@@ -56,18 +103,33 @@ class PyPIPublisher:
         
         return True
     
-    def get_current_version(self) -> str:
-        """Get current version from pyproject.toml."""
-        with open(self.pyproject_path, 'r') as f:
-            content = f.read()
-            match = re.search(r'version = "([^"]+)"', content)
-            if match:
-                return match.group(1)
+    def _load_pyproject(self) -> str:
+        """Read pyproject.toml once and cache its contents."""
+        if self._pyproject_content is None:
+            self._pyproject_content = self.pyproject_path.read_text()
+        return self._pyproject_content
+    
+    def _save_pyproject(self, content: str):
+        """Write pyproject.toml and refresh the cached contents."""
+        self.pyproject_path.write_text(content)
+        self._pyproject_content = content
+    
+    def get_current_version(self, content: Optional[str] = None) -> str:
+        """Get current version from pyproject.toml contents."""
+        if content is None:
+            content = self._load_pyproject()
+        try:
+            return tomllib.loads(content)["project"]["version"]
+        except (tomllib.TOMLDecodeError, KeyError):
             raise ValueError("Could not find version in pyproject.toml")
     
-    def bump_version(self, version_type: str) -> str:
-        """Bump version number."""
-        current_version = self.get_current_version()
+    def bump_version(self, version_type: str, content: str) -> Tuple[str, str]:
+        """Bump version number in pyproject.toml contents.
+        
+        Returns:
+            Tuple of (new_version, updated_content)
+        """
+        current_version = self.get_current_version(content)
         print(f"📦 Current version: {current_version}")
         
         # Parse version
@@ -89,64 +151,43 @@ class PyPIPublisher:
         new_version = f"{major}.{minor}.{patch}"
         print(f"🚀 New version: {new_version}")
         
-        # Update pyproject.toml
-        with open(self.pyproject_path, 'r') as f:
-            content = f.read()
-        
-        content = re.sub(
-            r'version = "[^"]+"',
-            f'version = "{new_version}"',
-            content
+        # Rewrite only the version key of the [project] table, leaving the rest of the file untouched
+        headers = _table_headers(content)
+        index = next((i for i, header in enumerate(headers) if header.group(1) == "project"), None)
+        if index is None:
+            raise ValueError("Could not find [project] table in pyproject.toml")
+        start = headers[index].end()
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(content)
+        project_table, count = _VERSION_RE.subn(
+            lambda match: f'{match.group(1)}"{new_version}"', content[start:end], count=1
         )
-        
-        with open(self.pyproject_path, 'w') as f:
-            f.write(content)
-        
-        return new_version
+        if count == 0:
+            raise ValueError("Could not find version in the [project] table of pyproject.toml")
+        new_content = content[:start] + project_table + content[end:]
+        
+        # The edit must change project.version and nothing else
+        expected = tomllib.loads(content)
+        expected["project"]["version"] = new_version
+        if tomllib.loads(new_content) != expected:
+            raise ValueError("Could not safely update the version in pyproject.toml")
+        return new_version, new_content
     
-    def update_github_urls(self, github_url: str):
-        """Update GitHub URLs in pyproject.toml and README.md."""
-        print(f"🔗 Updating GitHub URLs to: {github_url}")
-        
-        # Update pyproject.toml
-        with open(self.pyproject_path, 'r') as f:
-            content = f.read()
-        
-        # Replace GitHub URLs
-        content = re.sub(
-            r'https://github\.com/[^"]+',
-            github_url,
-            content
-        )
-        
-        with open(self.pyproject_path, 'w') as f:
-            f.write(content)
-        
-        # Update README.md
-        with open(self.readme_path, 'r') as f:
-            content = f.read()
-        
-        # Replace GitHub URLs
-        content = re.sub(
-            r'https://github\.com/[^"]+',
-            github_url,
-            content
-        )
-        
-        with open(self.readme_path, 'w') as f:
-            f.write(content)
+    def update_github_urls(self, content: str, github_url: str) -> str:
+        """Replace GitHub URLs in the given file contents."""
+        return _GH_URL_RE.sub(github_url, content)
     
     def clean_build_directories(self):
         """Clean build directories."""
         print("🧹 Cleaning build directories...")
         
-        dirs_to_clean = ["dist", "build", "*.egg-info"]
-        
-        for pattern in dirs_to_clean:
-            for path in self.project_root.glob(pattern):
-                if path.is_dir():
-                    shutil.rmtree(path)
-                    print(f"   Removed {path}")
+        # Single scan of the project root instead of one glob per pattern
+        with os.scandir(self.project_root) as entries:
+            for entry in entries:
+                name = entry.name
+                if not entry.is_dir() or not (name in ("dist", "build") or name.endswith(".egg-info")):
+                    continue
+                shutil.rmtree(entry.path)
+                print(f"   Removed {entry.path}")
     
     def run_tests(self) -> bool:
         """Run tests if they exist."""
@@ -168,39 +209,25 @@ class PyPIPublisher:
         
         try:
             # Try to run tests with pytest
-            result = subprocess.run(
-                ["python", "-m", "pytest", "tests/", "-v"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True
-            )
+            returncode, _ = self._stream(["python", "-m", "pytest", "tests/", "-v"])
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ Tests passed")
                 return True
             else:
                 print("❌ Tests failed")
-                print(result.stdout)
-                print(result.stderr)
                 return False
                 
         except FileNotFoundError:
             print("ℹ️  pytest not available, trying unittest")
             try:
-                result = subprocess.run(
-                    ["python", "-m", "unittest", "discover", "tests"],
-                    cwd=self.project_root,
-                    capture_output=True,
-                    text=True
-                )
+                returncode, _ = self._stream(["python", "-m", "unittest", "discover", "tests"])
                 
-                if result.returncode == 0:
+                if returncode == 0:
                     print("✅ Tests passed")
                     return True
                 else:
                     print("❌ Tests failed")
-                    print(result.stdout)
-                    print(result.stderr)
                     return False
                     
             except Exception as e:
@@ -212,15 +239,13 @@ class PyPIPublisher:
         print("🔨 Building package...")
         
         try:
-            # Build the package
-            result = subprocess.run(
-                ["python", "-m", "build"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True
-            )
+            # Build sdist and wheel concurrently; they are independent artifacts
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                sdist = executor.submit(self._stream, ["python", "-m", "build", "--sdist"], "[sdist] ")
+                wheel = executor.submit(self._stream, ["python", "-m", "build", "--wheel"], "[wheel] ")
+                (sdist_returncode, _), (wheel_returncode, _) = sdist.result(), wheel.result()
             
-            if result.returncode == 0:
+            if sdist_returncode == 0 and wheel_returncode == 0:
                 print("✅ Package built successfully")
                 
                 # List built files
@@ -232,8 +257,6 @@ class PyPIPublisher:
                 return True
             else:
                 print("❌ Build failed")
-                print(result.stdout)
-                print(result.stderr)
                 return False
                 
         except Exception as e:
@@ -251,20 +274,13 @@ class PyPIPublisher:
                 return False
             
             # Check with twine
-            result = subprocess.run(
-                ["twine", "check", "dist/*"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True
-            )
+            returncode, _ = self._stream(["twine", "check", "dist/*"])
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ Package check passed")
                 return True
             else:
                 print("❌ Package check failed")
-                print(result.stdout)
-                print(result.stderr)
                 return False
                 
         except Exception as e:
@@ -276,22 +292,15 @@ class PyPIPublisher:
         print("🚀 Publishing to TestPyPI...")
         
         try:
-            result = subprocess.run(
-                ["twine", "upload", "--repository", "testpypi", "dist/*"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True
-            )
+            returncode, _ = self._stream(["twine", "upload", "--repository", "testpypi", "dist/*"])
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ Successfully published to TestPyPI")
                 print("🔗 You can test the package with:")
                 print("   pip install --index-url https://test.pypi.org/simple/ maximum-agents")
                 return True
             else:
                 print("❌ Failed to publish to TestPyPI")
-                print(result.stdout)
-                print(result.stderr)
                 return False
                 
         except Exception as e:
@@ -303,21 +312,14 @@ class PyPIPublisher:
         print("🚀 Publishing to PyPI...")
         
         try:
-            result = subprocess.run(
-                ["twine", "upload", "dist/*"],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True
-            )
+            returncode, _ = self._stream(["twine", "upload", "dist/*"])
             
-            if result.returncode == 0:
+            if returncode == 0:
                 print("✅ Successfully published to PyPI!")
                 print("🔗 Package available at: https://pypi.org/project/maximum-agents/")
                 return True
             else:
                 print("❌ Failed to publish to PyPI")
-                print(result.stdout)
-                print(result.stderr)
                 return False
                 
         except Exception as e:
@@ -329,12 +331,13 @@ class PyPIPublisher:
         print(f"🏷️  Creating git tag: v{version}")
         
         try:
-            # Add and commit changes
-            subprocess.run(["git", "add", "pyproject.toml", "README.md"], cwd=self.project_root, check=True)
-            subprocess.run(["git", "commit", "-m", f"Release v{version}"], cwd=self.project_root, check=True)
-            
-            # Create tag
-            subprocess.run(["git", "tag", f"v{version}"], cwd=self.project_root, check=True)
+            # Add, commit and tag in a single shell invocation
+            cmd = (
+                "git add pyproject.toml README.md"
+                f' && git commit -m "Release v{version}"'
+                f" && git tag v{version}"
+            )
+            subprocess.run(cmd, shell=True, cwd=self.project_root, check=True)
             
             print(f"✅ Git tag v{version} created")
             print("💡 Don't forget to push: git push origin main --tags")
@@ -353,17 +356,25 @@ class PyPIPublisher:
         if not self.check_prerequisites():
             sys.exit(1)
         
+        content = self._load_pyproject()
+        
         # Update GitHub URL if provided
         if github_url:
-            self.update_github_urls(github_url)
+            print(f"🔗 Updating GitHub URLs to: {github_url}")
+            content = self.update_github_urls(content, github_url)
+            readme_content = self.readme_path.read_text()
+            self.readme_path.write_text(self.update_github_urls(readme_content, github_url))
         
         # Bump version
         try:
-            new_version = self.bump_version(version_type)
+            new_version, content = self.bump_version(version_type, content)
         except ValueError as e:
             print(f"❌ Error: {e}")
             sys.exit(1)
         
+        # Write pyproject.toml once with all modifications applied
+        self._save_pyproject(content)
+        
         if dry_run:
             print("🔍 Dry run mode - no actual publishing will occur")
             print(f"📦 Would publish version: {new_version}")
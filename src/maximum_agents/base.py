@@ -1,16 +1,23 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+import asyncio
 import json
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from functools import lru_cache, reduce, singledispatchmethod
+from itertools import islice
 
 from smolagents.utils import extract_code_from_text
 from .pydantic_final_answer_tools import PydanticFinalAnswerTool
 from .abstract import AbstractAgent
-from typing import Callable, Any, List, Dict, Optional, cast, Union
+from typing import Callable, Any, Iterator, List, Dict, Literal, Optional, Union
 from .records import  PartT, ResultT, BasicAnswerT, StepT, ThinkingPartT, CodePartT, OutputPartT, ToolCallT
 from smolagents import CodeAgent, Tool, LiteLLMModel, ChatMessage, ChatMessageStreamDelta, ToolCall
 from smolagents.agents import ToolOutput, ActionOutput
 from smolagents.memory import ActionStep, PlanningStep, FinalAnswerStep
 from typing import Generator
-from litellm.exceptions import InternalServerError
+from litellm.exceptions import InternalServerError, Timeout, RateLimitError, APIConnectionError, ServiceUnavailableError
 from .exponential_backoff import exponential_backoff_agentonly
 
 class NoFinalResultError(Exception):
@@ -34,100 +41,133 @@ SystemPromptHook = Callable[[str, str], str]  # Takes system_prompt and task, re
 FinalAnswerContextHook = Callable[[dict[str, Any]], dict[str, Any]]  # Takes context, returns potentially modified context
 AddInternalStepHook = Callable[[ActionStep], None]  # Takes step, returns potentially modified step
 
+HOOK_TYPES = (
+    "pre_run",
+    "post_run",
+    "pre_step",
+    "post_step",
+    "error",
+    "model_setup",
+    "model_selection",
+    "codeagent_kwargs",
+    "system_prompt",
+    "final_answer_context",
+    "add_internal_step",
+)
+# clear_hooks() without a type has never touched these
+_KEPT_ON_CLEAR_ALL = frozenset({"final_answer_context", "add_internal_step"})
+
+
 class HookRegistry:
     """Registry for managing hooks of different types."""
     
     def __init__(self):
-        self.pre_run_hooks: List[PreRunHook] = []
-        self.post_run_hooks: List[PostRunHook] = []
-        self.pre_step_hooks: List[PreStepHook] = []
-        self.post_step_hooks: List[PostStepHook] = []
-        self.error_hooks: List[ErrorHook] = []  
-        self.model_setup_hooks: List[ModelSetupHook] = []
-        self.model_selection_hooks: List[ModelSelectionHook] = []
-        self.codeagent_kwargs_hooks: List[CodeAgentKwargsHook] = []
-        self.system_prompt_hooks: List[SystemPromptHook] = []
-        self.final_answer_context_hooks: List[FinalAnswerContextHook] = []
-        self.add_internal_step_hooks: List[AddInternalStepHook] = []
+        # Hooks are registered rarely and iterated every step, so each type holds an immutable tuple
+        self._hooks: Dict[str, tuple[Any, ...]] = {hook_type: () for hook_type in HOOK_TYPES}
+    
+    def _add(self, hook_type: str, hook: Any) -> None:
+        self._hooks[hook_type] = (*self._hooks[hook_type], hook)
+    
+    def get_hooks(self, hook_type: str) -> tuple[Any, ...]:
+        """Return the hooks registered for a type, in registration order."""
+        return self._hooks[hook_type]
+    
+    @property
+    def pre_run_hooks(self) -> List[PreRunHook]:
+        return list(self._hooks["pre_run"])
+    
+    @property
+    def post_run_hooks(self) -> List[PostRunHook]:
+        return list(self._hooks["post_run"])
+    
+    @property
+    def pre_step_hooks(self) -> List[PreStepHook]:
+        return list(self._hooks["pre_step"])
+    
+    @property
+    def post_step_hooks(self) -> List[PostStepHook]:
+        return list(self._hooks["post_step"])
+    
+    @property
+    def error_hooks(self) -> List[ErrorHook]:
+        return list(self._hooks["error"])
+    
+    @property
+    def model_setup_hooks(self) -> List[ModelSetupHook]:
+        return list(self._hooks["model_setup"])
+    
+    @property
+    def model_selection_hooks(self) -> List[ModelSelectionHook]:
+        return list(self._hooks["model_selection"])
+    
+    @property
+    def codeagent_kwargs_hooks(self) -> List[CodeAgentKwargsHook]:
+        return list(self._hooks["codeagent_kwargs"])
+    
+    @property
+    def system_prompt_hooks(self) -> List[SystemPromptHook]:
+        return list(self._hooks["system_prompt"])
+    
+    @property
+    def final_answer_context_hooks(self) -> List[FinalAnswerContextHook]:
+        return list(self._hooks["final_answer_context"])
+    
+    @property
+    def add_internal_step_hooks(self) -> List[AddInternalStepHook]:
+        return list(self._hooks["add_internal_step"])
     
     def add_pre_run_hook(self, hook: PreRunHook):
         """Add a hook that runs before agent execution starts."""
-        self.pre_run_hooks.append(hook)
+        self._add("pre_run", hook)
     
     def add_post_run_hook(self, hook: PostRunHook):
         """Add a hook that runs after agent execution completes."""
-        self.post_run_hooks.append(hook)
+        self._add("post_run", hook)
     
     def add_pre_step_hook(self, hook: PreStepHook):
         """Add a hook that runs before each step is processed."""
-        self.pre_step_hooks.append(hook)
+        self._add("pre_step", hook)
     
     def add_post_step_hook(self, hook: PostStepHook):
         """Add a hook that runs after each step is formatted."""
-        self.post_step_hooks.append(hook)
+        self._add("post_step", hook)
     
     def add_error_hook(self, hook: ErrorHook):
         """Add a hook that runs when an error occurs during execution."""
-        self.error_hooks.append(hook)
+        self._add("error", hook)
     
     def add_model_setup_hook(self, hook: ModelSetupHook):
         """Add a hook that runs during model setup."""
-        self.model_setup_hooks.append(hook)
+        self._add("model_setup", hook)
     
     def add_model_selection_hook(self, hook: ModelSelectionHook):
         """Add a hook that runs during model selection and instantiation."""
-        self.model_selection_hooks.append(hook)
+        self._add("model_selection", hook)
     
     def add_codeagent_kwargs_hook(self, hook: CodeAgentKwargsHook):
         """Add a hook that provides additional kwargs for CodeAgent constructor."""
-        self.codeagent_kwargs_hooks.append(hook)
+        self._add("codeagent_kwargs", hook)
     
     def add_system_prompt_hook(self, hook: SystemPromptHook):
         """Add a hook that runs during system prompt setup."""
-        self.system_prompt_hooks.append(hook)
+        self._add("system_prompt", hook)
     
     def add_final_answer_context_hook(self, hook: FinalAnswerContextHook):
         """Add a hook that runs during final answer context setup."""
-        self.final_answer_context_hooks.append(hook)
+        self._add("final_answer_context", hook)
     
     def add_add_internal_step_hook(self, hook: AddInternalStepHook):
         """Add a hook that runs during internal step addition."""
-        self.add_internal_step_hooks.append(hook)
+        self._add("add_internal_step", hook)
 
     def clear_hooks(self, hook_type: Optional[str] = None):
         """Clear hooks of a specific type or all hooks if hook_type is None."""
         if hook_type is None:
-            self.pre_run_hooks.clear()
-            self.post_run_hooks.clear()
-            self.pre_step_hooks.clear()
-            self.post_step_hooks.clear()
-            self.error_hooks.clear()
-            self.model_setup_hooks.clear()
-            self.model_selection_hooks.clear()
-            self.codeagent_kwargs_hooks.clear()
-            self.system_prompt_hooks.clear()
-        elif hook_type == "pre_run":
-            self.pre_run_hooks.clear()
-        elif hook_type == "post_run":
-            self.post_run_hooks.clear()
-        elif hook_type == "pre_step":
-            self.pre_step_hooks.clear()
-        elif hook_type == "post_step":
-            self.post_step_hooks.clear()
-        elif hook_type == "error":
-            self.error_hooks.clear()
-        elif hook_type == "model_setup":
-            self.model_setup_hooks.clear()
-        elif hook_type == "model_selection":
-            self.model_selection_hooks.clear()
-        elif hook_type == "codeagent_kwargs":
-            self.codeagent_kwargs_hooks.clear()
-        elif hook_type == "system_prompt":
-            self.system_prompt_hooks.clear()
-        elif hook_type == "add_internal_step":
-            self.add_internal_step_hooks.clear()
-        elif hook_type == "final_answer_context":
-            self.final_answer_context_hooks.clear()
+            for name in HOOK_TYPES:
+                if name not in _KEPT_ON_CLEAR_ALL:
+                    self._hooks[name] = ()
+        elif hook_type in self._hooks:
+            self._hooks[hook_type] = ()
         else:
             raise ValueError(f"Unknown hook type: {hook_type}")
 
@@ -140,75 +180,152 @@ def default_model_selection_hook(model: str, model_kwargs: dict[str, Any]) -> Li
         return RetryingModel(model_id=model, **model_kwargs)
 
 
+# Transient provider failures worth retrying; the backoff jitter keeps concurrent agents from retrying in lockstep
+_RETRYABLE_EXCEPTIONS = (InternalServerError, Timeout, RateLimitError, APIConnectionError, ServiceUnavailableError)
+
 class RetryingModel(LiteLLMModel):
+    # CodeAgent calls generate, or generate_stream when streaming outputs
+    @exponential_backoff_agentonly(
+        max_retries=5, base_delay=1, max_delay=60, exceptions=_RETRYABLE_EXCEPTIONS
+    )
+    def generate(self, *args: Any, **kwargs: Any) -> ChatMessage:
+        return super().generate(*args, **kwargs)
+
     @exponential_backoff_agentonly(
-        max_retries=5, base_delay=1, max_delay=60, exceptions=(InternalServerError)
+        max_retries=5, base_delay=1, max_delay=60, exceptions=_RETRYABLE_EXCEPTIONS
     )
-    def __call__(self, *args: Any, **kwds: Any) -> Any:
-        return super().__call__(*args, **kwds)
+    def _start_stream(self, *args: Any, **kwargs: Any) -> tuple[list[ChatMessageStreamDelta], Iterator[ChatMessageStreamDelta]]:
+        """Send the request and read the first delta; the request fails (and is retried) here."""
+        stream = super().generate_stream(*args, **kwargs)
+        return list(islice(stream, 1)), stream
+
+    def generate_stream(self, *args: Any, **kwargs: Any) -> Generator[ChatMessageStreamDelta, None, None]:
+        # Once deltas have been yielded the stream cannot be replayed, so only its start is retried
+        head, stream = self._start_stream(*args, **kwargs)
+        yield from head
+        yield from stream
+
+
+# Anthropic honours at most four cache breakpoints per request
+_CACHE_RETENTIONS = ("5m", "1h")
+_CACHE_CONTROLS: Dict[str, Dict[str, Any]] = {ttl: {"type": "ephemeral", "ttl": ttl} for ttl in _CACHE_RETENTIONS}
+_TOOL_ROLES = frozenset({"tool-call", "tool-response", "tool", "developer"})
+
+
+def _text_block(text: str, cache_control: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "text", "text": text, "cache_control": cache_control}
+
+
+# Content blocks are either bare strings or dict blocks; dispatch on the exact type, with
+# anything else (e.g. dict subclasses) handled like a dict block
+_BLOCK_TEXT: Dict[type, Callable[[Any], str]] = {
+    str: lambda block: block,
+    dict: lambda block: block.get("text") or "",
+}
+_BLOCK_TAGGERS: Dict[type, Callable[[Any, Dict[str, Any]], Dict[str, Any]]] = {
+    str: _text_block,
+    dict: lambda block, cache_control: {**block, "cache_control": cache_control},
+}
+
+
+def _estimate_tokens(content: Any) -> int:
+    """Rough token count of a message's content (~4 characters per token)."""
+    if type(content) is str:
+        return len(content) // 4
+    if not content:
+        return 0
+    block_text = _BLOCK_TEXT.get
+    default = _BLOCK_TEXT[dict]
+    return sum(len(block_text(type(block), default)(block)) for block in content) // 4
 
 
 class CachedAnthropicModel(RetryingModel):
-    def __call__(
+    def __init__(
         self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        tools_to_call_from: Optional[List[Tool]] = None,
-        **kwargs,
-    ) -> ChatMessage:
-
-        new_messages_with_caching = []
-        total_cache_limit = 4
-        for message in reversed(messages):
-            message = cast(Dict[str, Any], message)
-            if isinstance(message["content"], str):
-                new_message_copy: Dict[str, Any] = message.copy()
-                content_block_new: Dict[str, Any] = {
-                    "type": "text",
-                    "text": message["content"],
-                }
-                if total_cache_limit > 0:
-                    content_block_new["cache_control"] = {"type": "ephemeral"}
-                    total_cache_limit -= 1
-                new_message_copy["content"] = [content_block_new]
-                new_messages_with_caching.append(new_message_copy)
-            else:
-                content_blocks_with_caching = []
-                for content_block in message["content"]:
-                    content_block_copy = content_block.copy()
-                    if isinstance(content_block_copy, str):
-                        if total_cache_limit > 0:
-                            total_cache_limit -= 1
-                            content_blocks_with_caching.append(
-                                {
-                                    "type": "text",
-                                    "text": content_block_copy,
-                                    "cache_control": {"type": "ephemeral"},
-                                }
-                            )
-                        else:
-                            content_blocks_with_caching.append(
-                                {
-                                    "type": "text",
-                                    "text": content_block_copy,
-                                }
-                            )
-                    else:
-                        if total_cache_limit > 0:
-                            total_cache_limit -= 1
-                            content_block_copy["cache_control"] = {"type": "ephemeral"}
-                        content_blocks_with_caching.append(content_block_copy)
-                new_message_copy = message.copy()
-                new_message_copy["content"] = content_blocks_with_caching
-                new_messages_with_caching.append(new_message_copy)
-        return super().__call__(
-            messages=list(reversed(new_messages_with_caching)),
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            tools_to_call_from=tools_to_call_from,
-            **kwargs,
-        )
+        *args: Any,
+        cache_retention: Optional[Literal["5m", "1h"]] = None,
+        min_token_count: int = 1024,
+        **kwargs: Any,
+    ):
+        if cache_retention is not None and cache_retention not in _CACHE_RETENTIONS:
+            raise ValueError(f"cache_retention must be one of {_CACHE_RETENTIONS}, got {cache_retention!r}")
+        super().__init__(*args, **kwargs)
+        # None picks the TTL per role; a fixed value applies to every breakpoint
+        self.cache_retention = cache_retention
+        # Anthropic does not cache prefixes shorter than this (2048 for Haiku models)
+        self.min_token_count = min_token_count
+
+    def _ttl_for_role(self, role: str) -> str:
+        if self.cache_retention is not None:
+            return self.cache_retention
+        # System prompt and tool output are stable across steps; conversation turns churn
+        return "1h" if role == "system" or role in _TOOL_ROLES else "5m"
+
+    @staticmethod
+    def _cache_targets(messages: List[ChatMessage]) -> List[int]:
+        """Indices of the messages that get a cache breakpoint on their last block.
+
+        The system prompt (which also covers the tool definitions that precede it) is the
+        large invariant prefix; the last tool message and the last user message extend the
+        cached prefix across agent steps.
+        """
+        # The system prompt leads the history and the other targets sit near its tail, so
+        # scan from both ends and stop early instead of walking every message
+        system_idx = next((idx for idx, message in enumerate(messages) if message.role == "system"), None)
+        tool_idx = user_idx = None
+        for idx in range(len(messages) - 1, -1, -1):
+            role = messages[idx].role
+            if tool_idx is None and role in _TOOL_ROLES:
+                tool_idx = idx
+            elif user_idx is None and role == "user":
+                user_idx = idx
+            if tool_idx is not None and user_idx is not None:
+                break
+        return sorted({idx for idx in (system_idx, tool_idx, user_idx) if idx is not None})
+
+    @staticmethod
+    def _tag_last_block(message: ChatMessage, cache_control: Dict[str, Any]) -> ChatMessage:
+        content = message.content
+        if type(content) is str:
+            return replace(message, content=[_text_block(content, cache_control)])
+        if not content:
+            return message
+        blocks = list(content)
+        last_block = blocks[-1]
+        blocks[-1] = _BLOCK_TAGGERS.get(type(last_block), _BLOCK_TAGGERS[dict])(last_block, cache_control)
+        return replace(message, content=blocks)
+
+    def _with_cache_breakpoints(self, messages: List[ChatMessage | Dict[str, Any]]) -> List[ChatMessage]:
+        """The messages with cache_control on the last block of each cache target."""
+        # Shallow copy; only the tagged messages are replaced, everything else is passed by reference
+        chat_messages = [message if isinstance(message, ChatMessage) else ChatMessage.from_dict(message) for message in messages]
+        new_messages_with_caching = list(chat_messages)
+        prefix_tokens = 0
+        counted = 0
+        longest_ttl_allowed = "1h"
+        for idx in self._cache_targets(chat_messages):
+            # Breakpoints on a prefix below the minimum are ignored by Anthropic but still
+            # count against the limit; the running estimate stops once it is large enough
+            while counted <= idx and prefix_tokens < self.min_token_count:
+                prefix_tokens += _estimate_tokens(chat_messages[counted].content)
+                counted += 1
+            if prefix_tokens < self.min_token_count:
+                continue
+            message = chat_messages[idx]
+            # Longer TTLs must come before shorter ones, so a 1h breakpoint after a 5m one is shortened
+            ttl = self._ttl_for_role(message.role)
+            if ttl == "1h" and longest_ttl_allowed == "5m":
+                ttl = "5m"
+            longest_ttl_allowed = ttl
+            new_messages_with_caching[idx] = self._tag_last_block(message, _CACHE_CONTROLS[ttl])
+        return new_messages_with_caching
+
+    # The breakpoints are set before the retrying call, so retries don't recompute them
+    def generate(self, messages: List[ChatMessage | Dict[str, Any]], *args: Any, **kwargs: Any) -> ChatMessage:
+        return super().generate(self._with_cache_breakpoints(messages), *args, **kwargs)
+
+    def generate_stream(self, messages: List[ChatMessage | Dict[str, Any]], *args: Any, **kwargs: Any) -> Generator[ChatMessageStreamDelta, None, None]:
+        return super().generate_stream(self._with_cache_breakpoints(messages), *args, **kwargs)
 
 def clear_code_from_text_and_return_seperate_text(text: str, code_block_tags: tuple[str, str]) -> tuple[str, str | None]:
     code_action = extract_code_from_text(text, code_block_tags)
@@ -221,9 +338,9 @@ def content_to_thinking_and_optionally_code(content: str, code_block_tags: tuple
     text, code_action = clear_code_from_text_and_return_seperate_text(content, code_block_tags)
     parts = []
     if code_action:
-        parts.append(CodePartT(content=code_action))
+        parts.append(CodePartT.model_construct(content=code_action))
     if text:
-        parts.append(ThinkingPartT(content=text))
+        parts.append(ThinkingPartT.model_construct(content=text))
     return parts
 
 def deduplicate_parts(parts: list[PartT]) -> list[PartT]:
@@ -242,6 +359,83 @@ def add_truncate_observation_to_step(step: ActionStep, max_print_outputs_length:
         # and add a note there saying that the output was truncated
         step.error.message = step.error.message[:max_print_outputs_length//2] + "\n\n[TRUNCATED] The above error message was truncated due to the max_print_outputs_length limit." + step.error.message[max_print_outputs_length//2:]
 
+# Streamed token deltas are logged in chunks once this much text or time has accumulated
+_DELTA_FLUSH_CHARS = 64
+_DELTA_FLUSH_SECONDS = 0.016
+
+
+class _DeltaCoalescer:
+    """Joins consecutive streamed token deltas into fewer, larger thinking steps."""
+    
+    def __init__(self, log: Callable[[StepT], None]):
+        self.log = log
+        self.buffer: List[str] = []
+        self.chars = 0
+        self.started = 0.0
+    
+    def add(self, text: str, step_number: int) -> None:
+        if not self.buffer:
+            self.started = time.monotonic()
+        self.buffer.append(text)
+        self.chars += len(text)
+        if self.chars >= _DELTA_FLUSH_CHARS or time.monotonic() - self.started >= _DELTA_FLUSH_SECONDS:
+            self.flush(step_number)
+    
+    def flush(self, step_number: int) -> None:
+        if not self.buffer:
+            return
+        content = "".join(self.buffer)
+        self.buffer.clear()
+        self.chars = 0
+        self.log(StepT.model_construct(step_number=step_number, parts=[ThinkingPartT.model_construct(content=content)]))
+
+# Shared pool for running independent codeagent_kwargs hooks concurrently (parallel_hooks=True)
+_HOOK_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="maximum_agents_hooks")
+
+# CodeAgents kept per BaseAgent; each holds its own Python executor
+_AGENT_CACHE_SIZE = 4
+
+def changes_process_state(hook: HookCallback) -> HookCallback:
+    """Mark a hook that changes process-wide state, such as the working directory.
+
+    Concurrent runs would race on that state, so run_many refuses agents with such hooks.
+    """
+    setattr(hook, "_changes_process_state", True)
+    return hook
+
+def _reset_agent_state(agent: CodeAgent) -> None:
+    """Drop the variables, imports and functions a reused CodeAgent kept from its previous task."""
+    agent.state.clear()
+    executor = agent.python_executor
+    executor_state = getattr(executor, "state", None)
+    if isinstance(executor_state, dict):
+        executor_state.clear()
+        executor_state["__name__"] = "__main__"
+    # Functions the model defined live apart from the variables
+    custom_tools = getattr(executor, "custom_tools", None)
+    if isinstance(custom_tools, dict):
+        custom_tools.clear()
+    executor.send_tools({**agent.tools, **agent.managed_agents})
+
+@lru_cache(maxsize=128)
+def _final_answer_schema_json(model_cls: type[BaseModel]) -> str:
+    """JSON schema of the final answer model, rendered once per model for the system prompt."""
+    return json.dumps(model_cls.model_json_schema())
+
+def _make_final_answer_validator(adapter: TypeAdapter[ResultT[Any]], context: dict[str, Any]) -> Callable[[Any], ResultT[Any]]:
+    """Specialise final answer validation to one agent's adapter and context, bound as closure locals."""
+    validate_python = adapter.validate_python
+
+    def validate_final_answer(answer: Any) -> ResultT[Any]:
+        return validate_python({"answer": answer}, context=context)
+
+    return validate_final_answer
+
+@lru_cache(maxsize=128)
+def _make_final_tool(model_cls: type[BaseModel], description: str) -> PydanticFinalAnswerTool:
+    """Build the final answer tool (and its JSON schema) once per model and description."""
+    return PydanticFinalAnswerTool(model_cls, description=description)
+
 class BaseAgent[T: BaseModel](AbstractAgent):
     def __init__(self, 
                     system_prompt: str, 
@@ -255,175 +449,198 @@ class BaseAgent[T: BaseModel](AbstractAgent):
                     max_steps: int=35,
                     hook_registry: Optional[HookRegistry] = None,
                     final_answer_context: dict[str, Any] = {},
+                    stream_deltas: bool = False,
+                    parallel_hooks: bool = False,
                  ):
         self.system_prompt = system_prompt
+        # Resolve an optional "{task}" placeholder once rather than on every run
+        self._prompt_has_placeholder = "{task}" in system_prompt
+        # Split template, so filling it in is a single join (str.format would trip over
+        # literal braces such as JSON examples in the prompt)
+        self._prompt_parts = tuple(system_prompt.split("{task}"))
         self.final_answer_model = final_answer_model
+        # Validates the final answer and wraps it in ResultT in a single pass
+        self._result_adapter: TypeAdapter[ResultT[T]] = TypeAdapter(ResultT[final_answer_model])
         self.final_answer_description = final_answer_description
         self.tools = tools
         self.additional_authorized_imports = additional_authorized_imports
         self.max_print_outputs_length = max_print_outputs_length
         self.max_steps = max_steps
+        # Also log the model's output token by token (coalesced) while a step is generated
+        self.stream_deltas = stream_deltas
+        # Run codeagent_kwargs hooks concurrently; results are still merged in registration order
+        self.parallel_hooks = parallel_hooks
         self.hooks = hook_registry or HookRegistry()  # Use provided registry or create new one
         self.agent : CodeAgent | None = None
+        # CodeAgents keyed by everything they are built from, reused across runs (least recently used last)
+        self._agent_cache: dict[tuple, CodeAgent] = {}
         
         # Handle model setup - if model is already a LiteLLMModel instance, use it directly
         if isinstance(model, LiteLLMModel):
             self.model = model
         else:
             # Set up default model selection hook if none exists
-            if not self.hooks.model_selection_hooks:
+            if not self.hooks.get_hooks("model_selection"):
                 self.hooks.add_model_selection_hook(lambda model: default_model_selection_hook(model, model_kwargs))
             self.model = self._setup_model(model)
         
         self.hooks.add_system_prompt_hook(self._add_task_to_system_prompt)
         self.hooks.add_system_prompt_hook(self._add_final_answer_description_to_system_prompt)
         self.final_answer_context = final_answer_context
-        for hook in self.hooks.final_answer_context_hooks:
+        for hook in self.hooks.get_hooks("final_answer_context"):
             self.final_answer_context = hook(self.final_answer_context)
-        # Add PydanticFinalAnswerTool after context has been processed
-        self.tools.append(
-            PydanticFinalAnswerTool(
-                self.final_answer_model,
-                description=self.final_answer_description
-                or "The final answer to the user's question.",
-                context=self.final_answer_context,
-            )
-        )
+        self._validate_final_answer = _make_final_answer_validator(self._result_adapter, self.final_answer_context)
+        # PydanticFinalAnswerTool is built lazily on the first run (see _ensure_final_answer_tool)
+        self._final_answer_tool: Optional[PydanticFinalAnswerTool] = None
         self.hooks.add_add_internal_step_hook(lambda step: add_truncate_observation_to_step(step, self.max_print_outputs_length))
 
+    def _ensure_final_answer_tool(self) -> None:
+        """Build the PydanticFinalAnswerTool on first use and add it to the tools."""
+        if self._final_answer_tool is None:
+            # Reuse the memoized tool's schema; only the validation context is per agent
+            final_answer_tool = copy.copy(_make_final_tool(
+                self.final_answer_model,
+                self.final_answer_description or "The final answer to the user's question.",
+            ))
+            final_answer_tool.context = self.final_answer_context
+            self._final_answer_tool = final_answer_tool
+            # A new list, so the caller's tools are left untouched
+            self.tools = [*self.tools, final_answer_tool]
+
     def _add_task_to_system_prompt(self, system_prompt: str, task: str) -> str:
+        if self._prompt_has_placeholder:
+            # Task was already substituted into the "{task}" placeholder
+            return system_prompt
         system_prompt = system_prompt + "\n\n Task: " + task
         return system_prompt
     
     def _add_final_answer_description_to_system_prompt(self, system_prompt: str, task: str) -> str:
-        system_prompt = system_prompt + "\n\n Final Answer Description: " + self.final_answer_description + "\n\n Final Answer Schema: " + json.dumps(self.final_answer_model.model_json_schema())
+        system_prompt = system_prompt + "\n\n Final Answer Description: " + self.final_answer_description + "\n\n Final Answer Schema: " + _final_answer_schema_json(self.final_answer_model)
         return system_prompt
     
     def _setup_model(self, model: str) -> LiteLLMModel:
         # Apply model setup hooks to modify the model name
-        for hook in self.hooks.model_setup_hooks:
+        for hook in self.hooks.get_hooks("model_setup"):
             model = hook(model)
         
         # Use model selection hooks to instantiate the model
         # If multiple hooks are registered, the last one takes precedence
-        if self.hooks.model_selection_hooks:
-            return self.hooks.model_selection_hooks[-1](model)
+        model_selection_hooks = self.hooks.get_hooks("model_selection")
+        if model_selection_hooks:
+            return model_selection_hooks[-1](model)
         else:
             # Fallback to default behavior if no hooks are registered
             return default_model_selection_hook(model, {})
  
     def _setup_system_prompt(self, task: str) -> str:
         # Apply system prompt hooks
-        system_prompt = self.system_prompt
-        for hook in self.hooks.system_prompt_hooks:
+        if self._prompt_has_placeholder:
+            system_prompt = task.join(self._prompt_parts)
+        else:
+            system_prompt = self.system_prompt
+        for hook in self.hooks.get_hooks("system_prompt"):
             system_prompt = hook(system_prompt, task)
         
         return system_prompt
     
     def format_step(self,step_number : int, step: ChatMessageStreamDelta | ToolCall | ToolOutput | ActionOutput | ActionStep | PlanningStep | FinalAnswerStep) -> StepT | ResultT[T]:
         assert self.agent is not None
+        return self._format_step(step, step_number)
+    
+    # Parts and steps built by the formatters only wrap strings we produced ourselves, so they
+    # use model_construct and skip validation; the final answer is still validated
+    @singledispatchmethod
+    def _format_step(self, step: Any, step_number: int) -> StepT | ResultT[T]:
+        # For streaming components, return empty step (will be filtered out)
+        return StepT.model_construct(step_number=step_number, parts=[])
+    
+    @_format_step.register(ChatMessageStreamDelta)
+    def _format_stream_delta(self, step: ChatMessageStreamDelta, step_number: int) -> StepT:
+        if not step.content:
+            return StepT.model_construct(step_number=step_number, parts=[])
+        return StepT.model_construct(step_number=step_number, parts=[ThinkingPartT.model_construct(content=step.content)])
+    
+    @_format_step.register(ActionStep)
+    def _format_action_step(self, step: ActionStep, step_number: int) -> StepT | ResultT[T]:
+        assert self.agent is not None
+        # If this is a final answer, return ResultT
+        if step.is_final_answer and step.action_output is not None:
+            return self._validate_final_answer(step.action_output)
         
-        if isinstance(step, ActionStep):
-            # Handle ActionStep - extract different parts and separate code blocks
-            parts = []
-            
-            # If this is a final answer, return ResultT
-            if step.is_final_answer and step.action_output is not None:
-                return ResultT[T](answer=self.final_answer_model.model_validate(step.action_output, context=self.final_answer_context))
-            
-            # Handle model output (thinking/reasoning text) - but don't extract code since code_action has it
-            if step.model_output:
-                if isinstance(step.model_output, str):
-                    # Extract only the thinking part, ignore code blocks since code_action contains them
-                    text, _ = clear_code_from_text_and_return_seperate_text(step.model_output, self.agent.code_block_tags)
-                    if text.strip():
-                        parts.append(ThinkingPartT(content=text.strip()))
-                else:
-                    # Handle list format - convert to string first
-                    model_output_str = str(step.model_output)
-                    text, _ = clear_code_from_text_and_return_seperate_text(model_output_str, self.agent.code_block_tags)
-                    if text.strip():
-                        parts.append(ThinkingPartT(content=text.strip()))
-            
-            # Handle separate code action if present
-            if step.code_action:
-                parts.append(CodePartT(content=step.code_action))
-            
-            # Handle observations (tool outputs, execution results) - prioritize this over action_output
-            if step.observations:
-                observation_parts = content_to_thinking_and_optionally_code(step.observations, self.agent.code_block_tags)
-                # Convert thinking parts from observations to output parts
-                for part in observation_parts:
-                    if isinstance(part, ThinkingPartT):
-                        parts.append(OutputPartT(content=part.content))
-                    else:
-                        parts.append(part)
-            # Only use action_output if observations is not available
-            elif step.action_output is not None and not step.is_final_answer:
-                action_output_str = str(step.action_output)
-                output_parts = content_to_thinking_and_optionally_code(action_output_str, self.agent.code_block_tags)
-                # Convert thinking parts to output parts for action outputs
-                for part in output_parts:
-                    if isinstance(part, ThinkingPartT):
-                        parts.append(OutputPartT(content=part.content))
-                    else:
-                        parts.append(part)
-            
-            return StepT(step_number=step_number, parts=deduplicate_parts(parts))
+        code_block_tags = self.agent.code_block_tags
+        # Thinking text from the model output (list outputs are stringified); its code blocks
+        # are dropped since code_action contains them
+        thinking = clear_code_from_text_and_return_seperate_text(str(step.model_output), code_block_tags)[0].strip() if step.model_output else ""
+        # Observations (tool outputs, execution results) take priority over action_output
+        output = step.observations or (str(step.action_output) if step.action_output is not None else "")
         
-        elif isinstance(step, PlanningStep):
-            # Handle PlanningStep - extract plan text and separate code blocks
-            parts = []
-            
-            if step.plan:
-                plan_parts = content_to_thinking_and_optionally_code(step.plan, self.agent.code_block_tags)
-                parts.extend(plan_parts)
-            
-            return StepT(step_number=step_number, parts=parts)
+        # Single pass; thinking parts of the output become output parts
+        parts = [
+            *((ThinkingPartT.model_construct(content=thinking),) if thinking else ()),
+            *((CodePartT.model_construct(content=step.code_action),) if step.code_action else ()),
+            *(
+                OutputPartT.model_construct(content=part.content) if isinstance(part, ThinkingPartT) else part
+                for part in (content_to_thinking_and_optionally_code(output, code_block_tags) if output else ())
+            ),
+        ]
+        
+        return StepT.model_construct(step_number=step_number, parts=deduplicate_parts(parts))
+    
+    @_format_step.register(PlanningStep)
+    def _format_planning_step(self, step: PlanningStep, step_number: int) -> StepT:
+        assert self.agent is not None
+        # Handle PlanningStep - extract plan text and separate code blocks
+        parts = []
         
-        elif isinstance(step, FinalAnswerStep):
-            # Handle FinalAnswerStep - this should be the final result
-            if step.output is not None:
-                return ResultT[T](answer=self.final_answer_model.model_validate(step.output, context=self.final_answer_context))
-            else:
-                # If no output, treat as empty step
-                return StepT(step_number=step_number, parts=[])
+        if step.plan:
+            plan_parts = content_to_thinking_and_optionally_code(step.plan, self.agent.code_block_tags)
+            parts.extend(plan_parts)
         
+        return StepT.model_construct(step_number=step_number, parts=parts)
+    
+    @_format_step.register(FinalAnswerStep)
+    def _format_final_answer_step(self, step: FinalAnswerStep, step_number: int) -> StepT | ResultT[T]:
+        # Handle FinalAnswerStep - this should be the final result
+        if step.output is not None:
+            return self._validate_final_answer(step.output)
         else:
-            # For streaming components, return empty step (will be filtered out)
-            return StepT(step_number=step_number, parts=[])
+            # If no output, treat as empty step
+            return StepT.model_construct(step_number=step_number, parts=[])
 
     def _execute_pre_run_hooks(self, task: str) -> str:
         """Execute all pre-run hooks in sequence."""
-        modified_task = task
-        for hook in self.hooks.pre_run_hooks:
-            modified_task = hook(modified_task)
-        return modified_task
+        hooks = self.hooks.get_hooks("pre_run")
+        if not hooks:
+            return task
+        return reduce(lambda modified_task, hook: hook(modified_task), hooks, task)
     
     def _execute_post_run_hooks(self, task: str, result: ResultT[T]) -> ResultT[T]:
         """Execute all post-run hooks in sequence."""
-        modified_result = result
-        for hook in self.hooks.post_run_hooks:
-            modified_result = hook(task, modified_result)
-        return modified_result
+        hooks = self.hooks.get_hooks("post_run")
+        if not hooks:
+            return result
+        return reduce(lambda modified_result, hook: hook(task, modified_result), hooks, result)
     
     def _execute_pre_step_hooks(self, step: Any) -> Any:
         """Execute all pre-step hooks in sequence."""
-        modified_step = step
-        for hook in self.hooks.pre_step_hooks:
-            modified_step = hook(modified_step)
-        return modified_step
+        hooks = self.hooks.get_hooks("pre_step")
+        if not hooks:
+            return step
+        return reduce(lambda modified_step, hook: hook(modified_step), hooks, step)
     
     def _execute_post_step_hooks(self, original_step: Any, formatted_step: StepT | ResultT[T]) -> StepT | ResultT[T]:
         """Execute all post-step hooks in sequence."""
-        modified_formatted_step = formatted_step
-        for hook in self.hooks.post_step_hooks:
-            modified_formatted_step = hook(original_step, modified_formatted_step)
-        return modified_formatted_step
+        hooks = self.hooks.get_hooks("post_step")
+        if not hooks:
+            return formatted_step
+        return reduce(lambda modified_formatted_step, hook: hook(original_step, modified_formatted_step), hooks, formatted_step)
     
     def _execute_error_hooks(self, error: Exception, task: str) -> Optional[ResultT[T]]:
         """Execute all error hooks until one returns a result or all return None."""
-        for hook in self.hooks.error_hooks:
+        hooks = self.hooks.get_hooks("error")
+        if not hooks:
+            return None
+        for hook in hooks:
             result = hook(error, task)
             if result is not None:
                 return result
@@ -431,13 +648,56 @@ class BaseAgent[T: BaseModel](AbstractAgent):
     
     def _execute_codeagent_kwargs_hooks(self) -> Dict[str, Any]:
         """Execute all CodeAgent kwargs hooks and merge their results."""
+        hooks = self.hooks.get_hooks("codeagent_kwargs")
+        if not hooks:
+            return {}
+        if self.parallel_hooks and len(hooks) > 1:
+            futures = [_HOOK_EXECUTOR.submit(hook) for hook in hooks]
+            results = (future.result() for future in futures)
+        else:
+            results = (hook() for hook in hooks)
         additional_kwargs = {}
-        for hook in self.hooks.codeagent_kwargs_hooks:
-            hook_kwargs = hook()
+        for hook_kwargs in results:
             if hook_kwargs:
                 additional_kwargs.update(hook_kwargs)
         return additional_kwargs
 
+    def _agent_cache_key(self, additional_kwargs: dict[str, Any]) -> Optional[tuple]:
+        """Every input the CodeAgent is built from, or None when it cannot be reused."""
+        if additional_kwargs.get("executor_type", "local") != "local":
+            # Remote executors keep their state out of reach of _reset_agent_state
+            return None
+        try:
+            kwargs_key = frozenset(additional_kwargs.items())
+        except TypeError:
+            # Unhashable kwargs: build a fresh CodeAgent for this run
+            return None
+        # The cached agent references the model, tools and step hooks, so their ids stay unique
+        return (
+            id(self.model),
+            tuple(id(tool) for tool in self.tools),
+            tuple(self.additional_authorized_imports),
+            self.max_steps,
+            self.max_print_outputs_length,
+            tuple(id(hook) for hook in self.hooks.get_hooks("add_internal_step")),
+            kwargs_key,
+        )
+
+    def _cached_agent(self, agent_config_key: Optional[tuple]) -> Optional[CodeAgent]:
+        if agent_config_key is None or agent_config_key not in self._agent_cache:
+            return None
+        # Mark as most recently used
+        agent = self._agent_cache[agent_config_key] = self._agent_cache.pop(agent_config_key)
+        _reset_agent_state(agent)
+        return agent
+
+    def _cache_agent(self, agent_config_key: Optional[tuple], agent: CodeAgent) -> None:
+        if agent_config_key is None:
+            return
+        if len(self._agent_cache) >= _AGENT_CACHE_SIZE:
+            self._agent_cache.pop(next(iter(self._agent_cache)))
+        self._agent_cache[agent_config_key] = agent
+
     def run(self, task: str, log: Callable[[StepT], None]) -> ResultT[T]:
         try:
             # Execute pre-run hooks
@@ -445,31 +705,50 @@ class BaseAgent[T: BaseModel](AbstractAgent):
             
             # Collect additional kwargs from hooks
             additional_kwargs = self._execute_codeagent_kwargs_hooks()
+            if self.stream_deltas:
+                additional_kwargs = {"stream_outputs": True, **additional_kwargs}
+            
+            self._ensure_final_answer_tool()
             
-            # Create CodeAgent with base parameters and additional kwargs
-            print(self.tools)
-            print("MODEL "+20*"#"+"\n"+str(self.model)+"\n"+20*"#")
-            self.agent = CodeAgent(
-                tools=self.tools,
-                model=self.model,
-                additional_authorized_imports=self.additional_authorized_imports,
-                max_steps=self.max_steps,
-                max_print_outputs_length=self.max_print_outputs_length,
-                step_callbacks=self.hooks.add_internal_step_hooks,
-                **additional_kwargs
-            )
+            # Reuse the CodeAgent across runs; only rebuild when something it is built from changes
+            agent_config_key = self._agent_cache_key(additional_kwargs)
+            agent = self._cached_agent(agent_config_key)
+            if agent is None:
+                print(self.tools)
+                print("MODEL "+20*"#"+"\n"+str(self.model)+"\n"+20*"#")
+                agent = CodeAgent(
+                    tools=self.tools,
+                    model=self.model,
+                    additional_authorized_imports=self.additional_authorized_imports,
+                    max_steps=self.max_steps,
+                    max_print_outputs_length=self.max_print_outputs_length,
+                    step_callbacks=self.hooks.add_internal_step_hooks,
+                    **additional_kwargs
+                )
+                self._cache_agent(agent_config_key, agent)
+            self.agent = agent
             system_prompt = self._setup_system_prompt(task)
             final_result = None
             
             # Use streaming approach - returns a generator that yields steps
-            step_generator =  self.agent.run(system_prompt, stream=True)
+            # reset=True clears memory left over from a previous run of the reused agent
+            step_generator =  self.agent.run(system_prompt, stream=True, reset=True)
             step_number = 1
+            deltas = _DeltaCoalescer(log) if self.stream_deltas else None
             try:
                 for step in step_generator:
+                    if isinstance(step, ChatMessageStreamDelta):
+                        if deltas is not None and step.content:
+                            deltas.add(step.content, step_number)
+                        continue
                     # Skip individual streaming components - only process comprehensive steps
-                    if isinstance(step, (ChatMessageStreamDelta, ToolCall, ToolOutput, ActionOutput)):
+                    if isinstance(step, (ToolCall, ToolOutput, ActionOutput)):
                         continue
                     
+                    # Streamed text always reaches the log before the step it belongs to
+                    if deltas is not None:
+                        deltas.flush(step_number)
+                    
                     # Execute pre-step hooks
                     step = self._execute_pre_step_hooks(step)
                     
@@ -489,6 +768,8 @@ class BaseAgent[T: BaseModel](AbstractAgent):
                     step_number += 1
             except GeneratorExit:
                 pass
+            if deltas is not None:
+                deltas.flush(step_number)
             
             if final_result is None:
                 raise NoFinalResultError("No final result found")
@@ -504,4 +785,57 @@ class BaseAgent[T: BaseModel](AbstractAgent):
             if recovery_result is not None:
                 return recovery_result
             # If no hook handled it, re-raise the original exception
-            raise
\ No newline at end of file
+            raise
+
+    async def arun(self, task: str, log: Callable[[StepT], None]) -> ResultT[T]:
+        """Awaitable run(). smolagents drives its step loop synchronously, so the run happens
+        on a worker thread; several agents can then be awaited together (e.g. asyncio.gather)
+        and overlap their LLM round-trips. Each concurrent run needs its own BaseAgent."""
+        return await asyncio.to_thread(self.run, task, log)
+
+    def _worker_clone(self) -> "BaseAgent[T]":
+        """Shallow copy sharing model, tools and hooks, but with its own CodeAgent(s)."""
+        worker = copy.copy(self)
+        worker.agent = None
+        worker._agent_cache = {}
+        return worker
+
+    async def run_many(self, tasks: list[str], log: Callable[[StepT], None], max_concurrency: int = 16) -> list[ResultT[T]]:
+        """Run independent tasks concurrently (eval sets, bulk labelling) and return their results in order.
+
+        Up to max_concurrency runs are in flight at once, each on a worker agent that keeps its
+        CodeAgent between tasks. This trades per-task latency for throughput; log receives steps
+        from all runs interleaved. The first failing task's exception is raised.
+
+        Runs share the process, so hooks that change process-wide state (marked with
+        changes_process_state, e.g. the builder's working directory hooks) are rejected.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        if any(getattr(hook, "_changes_process_state", False) for hook_type in HOOK_TYPES for hook in self.hooks.get_hooks(hook_type)):
+            # e.g. put_agent_in_temporary_dir's os.chdir hooks: concurrent runs would race on the cwd
+            raise ValueError("run_many does not support hooks that change process-wide state such as the working directory")
+        self._ensure_final_answer_tool()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        idle_workers: list[BaseAgent[T]] = []
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="maximum_agents_run")
+
+        async def run_one(task: str) -> ResultT[T]:
+            async with semaphore:
+                worker = idle_workers.pop() if idle_workers else self._worker_clone()
+                try:
+                    return await loop.run_in_executor(executor, worker.run, task, log)
+                finally:
+                    idle_workers.append(worker)
+
+        try:
+            return list(await asyncio.gather(*(run_one(task) for task in tasks)))
+        finally:
+            # Never wait here: that would block the event loop until runs still in flight
+            # (after a failure) finish; their threads exit on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_many_sync(self, tasks: list[str], log: Callable[[StepT], None], max_concurrency: int = 16) -> list[ResultT[T]]:
+        """Blocking wrapper around run_many for callers without an event loop."""
+        return asyncio.run(self.run_many(tasks, log, max_concurrency=max_concurrency))
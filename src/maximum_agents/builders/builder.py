@@ -13,7 +13,7 @@ from smolagents import ActionStep, Tool
 
 from ..datastore.core import MaximumDataStore
 from ..datastore.types import SettingsT
-from ..base import BaseAgent, HookRegistry
+from ..base import BaseAgent, HookRegistry, changes_process_state
 from ..document_types import DocumentT, DocumentsT
 
 class DatabaseTool(Tool):
@@ -56,6 +56,7 @@ class AgentBuilder:
         self._temp_dir = tempfile.mkdtemp(prefix="agent_workspace_")
         
         # Add pre-run hook to change to temp directory
+        @changes_process_state
         def temp_dir_pre_run_hook(task: str) -> str:
             if self._temp_dir:
                 self._original_cwd = os.getcwd()
@@ -107,6 +108,7 @@ class AgentBuilder:
         self._specific_dir = os.path.abspath(directory_path)
         
         # Add pre-run hook to change to specific directory
+        @changes_process_state
         def specific_dir_pre_run_hook(task: str) -> str:
             if self._specific_dir:
                 self._original_cwd = os.getcwd()
@@ -1,12 +1,161 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Union
+from contextlib import contextmanager
 import pandas as pd
 import duckdb
 import os
-import glob
-from pathlib import Path
-from .types import ParcelT, AccessControlT, SettingsT, TableInfoT
+from .types import ParcelT, AccessControlT, SettingsT, TableInfoT, DuckDBTypes
 import json
+import re
+import queue
+import threading
+import functools
+import time
+import atexit
+import weakref
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional
+    pa = None
+
+# Statements that can change the set of tables in a database
+_DDL_RE = re.compile(r'\b(CREATE|DROP|ALTER)\b', re.IGNORECASE)
+# Queries whose result can safely be wrapped in an outer LIMIT
+_SELECT_RE = re.compile(r'^(SELECT|WITH)\b', re.IGNORECASE)
+_IDENT_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,62}$')
+# Row lists at least this long are converted via Arrow rather than pandas
+_ARROW_MIN_ROWS = 10_000
+
+# Arrow types for parcel columns whose JSON values convert losslessly
+_ARROW_TYPES = {
+    DuckDBTypes.TINYINT: pa.int8(),
+    DuckDBTypes.SMALLINT: pa.int16(),
+    DuckDBTypes.INTEGER: pa.int32(),
+    DuckDBTypes.BIGINT: pa.int64(),
+    DuckDBTypes.UTINYINT: pa.uint8(),
+    DuckDBTypes.USMALLINT: pa.uint16(),
+    DuckDBTypes.UINTEGER: pa.uint32(),
+    DuckDBTypes.UBIGINT: pa.uint64(),
+    DuckDBTypes.FLOAT: pa.float32(),
+    DuckDBTypes.DOUBLE: pa.float64(),
+    DuckDBTypes.VARCHAR: pa.string(),
+    DuckDBTypes.BOOLEAN: pa.bool_(),
+} if pa is not None else {}
+
+# Row data accepted by the bulk write methods: rows as dicts, or an already columnar table
+TableDataT = Union[List[Dict[str, Any]], pd.DataFrame, "pa.Table"]
+# How long a list_databases directory scan is reused
+_DB_LIST_TTL_SECONDS = 5.0
+# EXPLAIN ANALYZE executes the explained statement, so only a plain EXPLAIN is read-only
+_ANALYZE_RE = re.compile(r'\bANALY[SZ]E\b', re.IGNORECASE)
+# Table functions such as pragma_table_info('t') name tables in string literals
+_STRING_LITERAL_RE = re.compile(r"'")
+# View name ingested data is registered under; registered views shadow tables of the same name
+_INGEST_VIEW = "_maximum_agents_ingest"
+
+
+@functools.lru_cache(maxsize=128)
+def _insert_sql(table_name: str, columns: Tuple[str, ...]) -> str:
+    """INSERT statement for a batch registered as _INGEST_VIEW, cached per (table, columns)."""
+    return f"INSERT INTO {_qident(table_name)} ({', '.join(map(_qident, columns))}) SELECT * FROM {_INGEST_VIEW}"
+
+
+@contextmanager
+def _registered(conn: duckdb.DuckDBPyConnection, data: Any) -> Iterator[str]:
+    """Register a DataFrame or Arrow table on the cursor as _INGEST_VIEW for the duration of the block.
+    
+    Explicit registration, unlike a replacement scan of a local variable, cannot be
+    shadowed by a real table that happens to share the variable's name.
+    """
+    conn.register(_INGEST_VIEW, data)
+    try:
+        yield _INGEST_VIEW
+    finally:
+        conn.unregister(_INGEST_VIEW)
+
+
+@functools.lru_cache(maxsize=128)
+def _update_by_id_sql(table_name: str, columns: Tuple[str, ...]) -> str:
+    """UPDATE-by-id statement, cached per (table, columns)."""
+    set_clause = ', '.join(f"{_qident(col)} = ?" for col in columns)
+    return f"UPDATE {_qident(table_name)} SET {set_clause} WHERE id = ? RETURNING id"
+
+
+@functools.lru_cache(maxsize=4096)
+def _qident(name: str) -> str:
+    """Validate a table or column name and return it double-quoted for interpolation into SQL."""
+    if not _IDENT_RE.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _to_columnar(data: Any) -> Any:
+    """Convert rows to a single-chunk Arrow table for zero-copy DuckDB ingest.
+    
+    DataFrames are returned unchanged, since DuckDB scans them natively and Arrow rejects
+    object columns of mixed types. Falls back to a pandas DataFrame when pyarrow is not
+    installed, and for rows that Arrow would mangle: from_pylist takes its columns from the
+    first row only and rejects mixed value types, while pandas unions the keys and keeps
+    mixed columns as objects.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    if pa is None:
+        return pd.DataFrame(data)
+    if isinstance(data, pa.Table):
+        table = data
+    else:
+        keys = data[0].keys() if data else {}.keys()
+        if any(row.keys() != keys for row in data):
+            return pd.DataFrame(data)
+        try:
+            table = pa.Table.from_pylist(data)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pd.DataFrame(data)
+    # Many small record batches slow DuckDB scans down considerably
+    return table.combine_chunks()
+
+
+def _parcel_to_columnar(parcel: ParcelT) -> Any:
+    """Transpose parcel rows into an Arrow table typed from the parcel schema.
+    
+    Columns whose declared type has no lossless Arrow equivalent for JSON values (or whose
+    values don't fit it) are left to Arrow's inference; apply_column_metadata_from_parcel
+    then converts them to the declared type where every value allows it. Falls back to a pandas DataFrame without pyarrow or for rows
+    Arrow cannot represent.
+    """
+    rows = parcel.rows
+    if pa is None or not rows:
+        return pd.DataFrame(rows)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    arrays = []
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        metadata = parcel.parcel_schema.get(column)
+        arrow_type = _ARROW_TYPES.get(metadata.type) if metadata and metadata.type else None
+        try:
+            arrays.append(pa.array(values, type=arrow_type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                return pd.DataFrame(rows)
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def _flush_at_exit(backend_ref: "weakref.ReferenceType[LocalBackend]") -> None:
+    """Write rows still buffered when the interpreter exits."""
+    backend = backend_ref()
+    if backend is None:
+        return
+    try:
+        backend._flush_buffers(None)
+    except ValueError as e:
+        print(f"Failed to write buffered rows at exit: {str(e)}")
+    if backend._flush_error is not None:
+        print(f"Failed to write buffered rows: {str(backend._flush_error)}")
+
 
 class Backend(ABC):
     def __init__(self, settings: SettingsT, api_key: Optional[str] = None):
@@ -21,6 +170,15 @@ class Backend(ABC):
     def execute_sql(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None) -> pd.DataFrame:
         pass
     
+    @abstractmethod
+    def execute_sql_batches(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None, rows_per_batch: int = 100_000) -> Iterator[Any]:
+        """Execute a query and stream the result as Arrow record batches.
+        
+        The query holds a cursor until the generator is exhausted or closed; callers that
+        stop early should call close() on it (or iterate it inside contextlib.closing).
+        """
+        pass
+    
     @abstractmethod
     def database_exists(self, database_id: str) -> bool:
         pass
@@ -49,24 +207,43 @@ class Backend(ABC):
     def get_table_info(self, database_id: str, table_name: str) -> Optional[TableInfoT]:
         pass
     
+    @abstractmethod
+    def get_sample_rows(self, database_id: str, table_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return up to `limit` rows of a table as plain dicts"""
+        pass
+    
     @abstractmethod
     def add_row(self, database_id: str, table_name: str, row_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> None:
         pass
     
+    @abstractmethod
+    def add_rows(self, database_id: str, table_name: str, rows: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+        pass
+    
+    @abstractmethod
+    def flush(self, database_id: Optional[str] = None) -> None:
+        """Write out any buffered rows"""
+        pass
+    
+    @abstractmethod
+    def transaction(self, database_id: str) -> Iterator[None]:
+        """Context manager grouping this thread's writes into one commit"""
+        pass
+    
     @abstractmethod
     def update_row_by_id(self, database_id: str, table_name: str, row_id: str, update_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> bool:
         pass
     
     @abstractmethod
-    def overwrite_table(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def overwrite_table(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         pass
     
     @abstractmethod
-    def append_data(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def append_data(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         pass
 
     @abstractmethod
-    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False) -> List[Dict[str, str]]:
+    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False, columns: Optional[Dict[str, DuckDBTypes]] = None) -> List[Dict[str, str]]:
         """Load CSV file and return schema information"""
         pass
 
@@ -79,42 +256,164 @@ class Backend(ABC):
 class LocalBackend(Backend):
     def __init__(self, settings: SettingsT, api_key: Optional[str] = None):
         super().__init__(settings, api_key)
+        # One DuckDB instance per database, plus a bounded pool of cursors on it
         self._connections: Dict[str, duckdb.DuckDBPyConnection] = {}
+        self._pools: Dict[str, queue.Queue[duckdb.DuckDBPyConnection]] = {}
+        if settings.pool_size is not None and settings.pool_size < 1:
+            raise ValueError(f"pool_size must be at least 1, got {settings.pool_size}")
+        self._pool_size = settings.pool_size or min(os.cpu_count() or 1, 4)
+        self._lock = threading.Lock()
+        # add_row buffers rows per (database, table, columns) and flushes them in batches
+        self._write_buffers: Dict[Tuple[str, str, Tuple[str, ...]], List[List[Any]]] = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._flush_timer: Optional[threading.Timer] = None
+        # Failure of a background flush, raised by the next add_row or flush
+        self._flush_error: Optional[Exception] = None
+        if settings.write_batch_size > 1:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+        # Table names per database, loaded lazily and dropped whenever DDL may have run
+        self._table_cache: Dict[str, set[str]] = {}
+        # Cursor of the open transaction per database, for the current thread only
+        self._transactions = threading.local()
+        # Parsed (statement types, referenced tables) per (database, query) for access control
+        self._parse_sql = functools.lru_cache(maxsize=1024)(self._parse_sql_uncached)
+        # Databases known to exist, so hot paths skip the filesystem stat
+        self._known_dbs: set[str] = set()
+        # (timestamp, names) of the last list_databases directory scan
+        self._db_list_cache: Optional[Tuple[float, List[str]]] = None
         
     
     def _get_db_path(self, database_id: str) -> str:
         if not self.api_key:
             raise ValueError("API key is required")
         
+        if self.settings.in_memory:
+            # Named in-memory databases are shared by every connection in the process
+            return f":memory:{self.api_key}_{database_id}" if self.settings.shared_memory else ":memory:"
+        
         base_path = self.settings.database_path or "databases"
         api_key_dir = os.path.join(base_path, self.api_key)
         os.makedirs(api_key_dir, exist_ok=True)
         return os.path.join(api_key_dir, f"{database_id}.duckdb")
     
+    def _configure_connection(self, conn: duckdb.DuckDBPyConnection) -> None:
+        """Apply the per-database DuckDB settings once, right after opening."""
+        # Each open database gets its own thread pool, so the default of one thread per core
+        # multiplies quickly when many databases are open
+        threads = self.settings.duckdb_threads or max(1, (os.cpu_count() or 1) // 4)
+        conn.execute(f"SET threads TO {int(threads)}")
+        if self.settings.duckdb_memory_limit:
+            memory_limit = self.settings.duckdb_memory_limit.replace("'", "''")
+            conn.execute(f"SET memory_limit = '{memory_limit}'")
+        conn.execute(f"SET preserve_insertion_order = {str(self.settings.preserve_insertion_order).lower()}")
+        conn.execute("PRAGMA enable_object_cache")
+    
     def _get_connection(self, database_id: str) -> duckdb.DuckDBPyConnection:
-        if database_id not in self._connections:
-            db_path = self._get_db_path(database_id)
-            self._connections[database_id] = duckdb.connect(db_path)
-        return self._connections[database_id]
+        with self._lock:
+            if database_id not in self._connections:
+                db_path = self._get_db_path(database_id)
+                conn = duckdb.connect(db_path)
+                self._configure_connection(conn)
+                self._connections[database_id] = conn
+                if database_id not in self._known_dbs:
+                    self._known_dbs.add(database_id)
+                    self._db_list_cache = None
+            return self._connections[database_id]
+    
+    def _get_pool(self, database_id: str) -> queue.Queue[duckdb.DuckDBPyConnection]:
+        pool = self._pools.get(database_id)
+        if pool is None:
+            conn = self._get_connection(database_id)
+            with self._lock:
+                pool = self._pools.get(database_id)
+                if pool is None:
+                    pool = queue.Queue(maxsize=self._pool_size)
+                    for _ in range(self._pool_size):
+                        pool.put(conn.cursor())
+                    self._pools[database_id] = pool
+        return pool
+    
+    def _active_transaction(self, database_id: str) -> Optional[duckdb.DuckDBPyConnection]:
+        return getattr(self._transactions, "cursors", {}).get(database_id)
+    
+    def _commit(self, database_id: str, conn: duckdb.DuckDBPyConnection) -> None:
+        """Commit, unless the write belongs to this thread's open transaction."""
+        if self._active_transaction(database_id) is None:
+            conn.commit()
+    
+    @contextmanager
+    def transaction(self, database_id: str) -> Iterator[None]:
+        tx_conn = self._active_transaction(database_id)
+        if tx_conn is not None:
+            # Nested: the outer transaction commits
+            yield
+            return
+        
+        # Rows buffered before the transaction are not part of it
+        self.flush(database_id)
+        with self._checkout(database_id) as conn:
+            conn.execute("BEGIN TRANSACTION")
+            cursors = self._transactions.__dict__.setdefault("cursors", {})
+            cursors[database_id] = conn
+            try:
+                yield
+            except BaseException:
+                del cursors[database_id]
+                conn.execute("ROLLBACK")
+                self._invalidate_tables(database_id)
+                raise
+            else:
+                del cursors[database_id]
+                conn.execute("COMMIT")
+    
+    @contextmanager
+    def _checkout(self, database_id: str) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Borrow a cursor from the database's pool, blocking while all are in use."""
+        tx_conn = self._active_transaction(database_id)
+        if tx_conn is not None:
+            # Work inside a transaction stays on the transaction's cursor
+            yield tx_conn
+            return
+        pool = self._get_pool(database_id)
+        conn = pool.get()
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
     
     def database_exists(self, database_id: str) -> bool:
+        if database_id in self._known_dbs:
+            return True
+        if self.settings.in_memory:
+            return database_id in self._connections
         try:
             db_path = self._get_db_path(database_id)
-            return os.path.exists(db_path)
         except Exception:
             return False
+        if os.path.isfile(db_path):
+            self._known_dbs.add(database_id)
+            return True
+        return False
     
     def create_database(self, database_id: str) -> None:
         self._get_connection(database_id)
     
+    def _get_tables(self, database_id: str) -> set[str]:
+        tables = self._table_cache.get(database_id)
+        if tables is None:
+            with self._checkout(database_id) as conn:
+                result = conn.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'main'")
+                tables = {row[0] for row in result.fetchall()}
+            self._table_cache[database_id] = tables
+        return tables
+    
+    def _invalidate_tables(self, database_id: str) -> None:
+        self._table_cache.pop(database_id, None)
+    
     def table_exists(self, database_id: str, table_name: str) -> bool:
         try:
-            conn = self._get_connection(database_id)
-            result = conn.execute(
-                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
-                [table_name]
-            ).fetchone()
-            return result is not None and result[0] > 0
+            return table_name in self._get_tables(database_id)
         except Exception:
             return False
     
@@ -122,19 +421,27 @@ class LocalBackend(Backend):
         if not self.table_exists(database_id, table_name):
             return []
         
-        conn = self._get_connection(database_id)
-        result = conn.execute(
-            "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
-            [table_name]
-        )
-        return [{"column_name": row[0], "data_type": row[1]} for row in result.fetchall()]
+        with self._checkout(database_id) as conn:
+            result = conn.execute(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+                [table_name]
+            )
+            return [{"column_name": row[0], "data_type": row[1]} for row in result.fetchall()]
+    
+    def get_sample_rows(self, database_id: str, table_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        self.flush(database_id)
+        with self._checkout(database_id) as conn:
+            result = conn.execute(f"SELECT * FROM {_qident(table_name)} LIMIT {int(limit)}")
+            # Arrow -> pylist skips the per-column object casts pandas' to_dict would do
+            if pa is not None:
+                return result.arrow().to_pylist()
+            columns = [col[0] for col in result.description]
+            return [dict(zip(columns, row)) for row in result.fetchall()]
     
     def get_table_info(self, database_id: str, table_name: str) -> Optional[TableInfoT]:
         if not self.table_exists(database_id, table_name):
             return None
         
-        conn = self._get_connection(database_id)
-        
         # Check if metadata table exists
         metadata_table_exists = self.table_exists(database_id, '_table_metadata')
         if not metadata_table_exists:
@@ -159,10 +466,11 @@ class LocalBackend(Backend):
         
         # Get metadata from the metadata table
         try:
-            result = conn.execute(
-                "SELECT hint, parcel_schema_json, readonly FROM _table_metadata WHERE table_name = ?",
-                [table_name]
-            ).fetchone()
+            with self._checkout(database_id) as conn:
+                result = conn.execute(
+                    "SELECT hint, parcel_schema_json, readonly FROM _table_metadata WHERE table_name = ?",
+                    [table_name]
+                ).fetchone()
             
             if result:
                 import json
@@ -226,81 +534,175 @@ class LocalBackend(Backend):
         if not self.table_exists(database_id, table_name):
             raise ValueError(f"Table {table_name} does not exist")
         
-        conn = self._get_connection(database_id)
-        columns = list(row_data.keys())
-        values = list(row_data.values())
-        placeholders = ', '.join(['?' for _ in columns])
-        columns_str = ', '.join(columns)
+        key = (database_id, table_name, tuple(row_data.keys()))
+        # Build (and validate) the statement now so bad identifiers fail here, not in a later flush
+        _insert_sql(table_name, key[2])
+        if self.settings.write_batch_size <= 1 or self._active_transaction(database_id) is not None:
+            # Unbuffered; inside a transaction there is no per-row commit to save, and the row
+            # must not escape into another thread's flush
+            self._insert_rows(database_id, table_name, key[2], [list(row_data.values())])
+            return
+        self._raise_flush_error()
+        with self._buffer_lock:
+            buffer = self._write_buffers.setdefault(key, [])
+            buffer.append(list(row_data.values()))
+            should_flush = len(buffer) >= self.settings.write_batch_size
+            if not should_flush and self._flush_timer is None:
+                # Bound how long a row can sit in the buffer
+                self._flush_timer = threading.Timer(self.settings.write_max_wait_ms / 1000, self._flush_in_background)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
         
-        insert_sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-        conn.execute(insert_sql, values)
-        conn.commit()
+        if should_flush:
+            self.flush(database_id)
     
-    def update_row_by_id(self, database_id: str, table_name: str, row_id: str, update_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> bool:
+    def add_rows(self, database_id: str, table_name: str, rows: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
         if access_control and access_control.read_only:
             raise ValueError("Write operations not allowed with read-only access control")
         
+        if not rows:
+            return  # Nothing to add
+        
         if not self.table_exists(database_id, table_name):
             raise ValueError(f"Table {table_name} does not exist")
         
-        conn = self._get_connection(database_id)
+        # Keep earlier buffered rows ahead of this batch
+        self.flush(database_id)
         
-        # Check if row exists
-        check_result = conn.execute(
-            f"SELECT COUNT(*) FROM {table_name} WHERE id = ?",
-            [row_id]
-        ).fetchone()
+        # Rows with the same columns are inserted together
+        groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row.keys()), []).append(list(row.values()))
+        for columns, values in groups.items():
+            self._insert_rows(database_id, table_name, columns, values)
+    
+    def flush(self, database_id: Optional[str] = None) -> None:
+        self._raise_flush_error()
+        self._flush_buffers(database_id)
+    
+    def _raise_flush_error(self) -> None:
+        error, self._flush_error = self._flush_error, None
+        if error is not None:
+            raise error
+    
+    def _flush_in_background(self) -> None:
+        with self._buffer_lock:
+            # This timer has fired; rows left behind (in skipped databases) may start a new one
+            self._flush_timer = None
+        try:
+            self._flush_buffers(None)
+        except ValueError as e:
+            # Nobody to raise to on the timer thread; the next add_row or flush reports it
+            self._flush_error = e
+    
+    def _flush_buffers(self, database_id: Optional[str]) -> None:
+        """Write out buffered rows, raising ValueError for rows that could not be written."""
+        failures: List[Tuple[str, duckdb.Error]] = []
+        with self._buffer_lock:
+            database_ids = {key[0] for key in self._write_buffers if database_id is None or key[0] == database_id}
+        for db_id in sorted(database_ids):
+            if self._active_transaction(db_id) is not None:
+                # The buffered rows belong to other threads and must not be written (and rolled
+                # back) through this thread's transaction. This thread's own rows were flushed
+                # when it began, and its add_row calls inside it bypass the buffer.
+                continue
+            # Check the cursor out before taking the flush lock, so the lock holder never waits
+            # for a cursor that another thread's transaction (itself calling flush) holds
+            with self._checkout(db_id) as conn, self._flush_lock:
+                with self._buffer_lock:
+                    pending = [(key, self._write_buffers.pop(key)) for key in list(self._write_buffers) if key[0] == db_id]
+                    if not self._write_buffers and self._flush_timer is not None:
+                        self._flush_timer.cancel()
+                        self._flush_timer = None
+                
+                for (_, table_name, columns), values in pending:
+                    try:
+                        self._write_rows(db_id, conn, table_name, columns, values)
+                    except duckdb.Error:
+                        # Keep the valid rows of a failed batch: retry them one by one
+                        for row in values:
+                            try:
+                                self._write_rows(db_id, conn, table_name, columns, [row])
+                            except duckdb.Error as e:
+                                failures.append((table_name, e))
+        if failures:
+            table_name, error = failures[0]
+            raise ValueError(f"Failed to write {len(failures)} buffered row(s), first in table {table_name}: {error}") from error
+    
+    def _insert_rows(self, database_id: str, table_name: str, columns: Tuple[str, ...], values: List[List[Any]]) -> None:
+        """Insert a batch of rows with a single statement and a single commit."""
+        with self._checkout(database_id) as conn:
+            self._write_rows(database_id, conn, table_name, columns, values)
+    
+    def _write_rows(self, database_id: str, conn: duckdb.DuckDBPyConnection, table_name: str, columns: Tuple[str, ...], values: List[List[Any]]) -> None:
+        with _registered(conn, pd.DataFrame(values, columns=list(columns))):
+            conn.execute(_insert_sql(table_name, columns))
+        self._commit(database_id, conn)
+    
+    def update_row_by_id(self, database_id: str, table_name: str, row_id: str, update_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> bool:
+        if access_control and access_control.read_only:
+            raise ValueError("Write operations not allowed with read-only access control")
         
-        if not check_result or check_result[0] == 0:
-            return False
+        if not self.table_exists(database_id, table_name):
+            raise ValueError(f"Table {table_name} does not exist")
         
-        # Build UPDATE statement
-        set_clauses = [f"{col} = ?" for col in update_data.keys()]
-        set_clause = ', '.join(set_clauses)
-        values = list(update_data.values()) + [row_id]
+        # Buffered inserts must land before the update can see them
+        self.flush(database_id)
         
-        update_query = f"UPDATE {table_name} SET {set_clause} WHERE id = ?"
-        conn.execute(update_query, values)
-        conn.commit()
-        return True
+        # RETURNING tells us whether a row matched without a separate existence check
+        update_query = _update_by_id_sql(table_name, tuple(update_data.keys()))
+        values = list(update_data.values()) + [row_id]
+        with self._checkout(database_id) as conn:
+            updated = conn.execute(update_query, values).fetchall()
+            self._commit(database_id, conn)
+        return len(updated) > 0
     
-    def overwrite_table(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def overwrite_table(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         if access_control and access_control.read_only:
             raise ValueError("Write operations not allowed with read-only access control")
         
-        if not data:
+        if len(data) == 0:
             raise ValueError("Cannot overwrite table with empty data")
         
-        conn = self._get_connection(database_id)
-        df = pd.DataFrame(data)
+        table_data = _to_columnar(data)
+        self.flush(database_id)
         
-        # Drop existing table if it exists
-        conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-        
-        # Create new table from DataFrame
-        conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM df")
-        conn.commit()
+        with self._checkout(database_id) as conn:
+            # Drop existing table if it exists
+            conn.execute(f"DROP TABLE IF EXISTS {_qident(table_name)}")
+            
+            # Create new table from the columnar data
+            with _registered(conn, table_data) as view:
+                conn.execute(f"CREATE TABLE {_qident(table_name)} AS SELECT * FROM {view}")
+            self._commit(database_id, conn)
+        self._invalidate_tables(database_id)
     
-    def append_data(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def append_data(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         if access_control and access_control.read_only:
             raise ValueError("Write operations not allowed with read-only access control")
         
-        if not data:
+        if len(data) == 0:
             return  # Nothing to append
         
         if not self.table_exists(database_id, table_name):
             raise ValueError(f"Table {table_name} does not exist")
         
-        conn = self._get_connection(database_id)
-        df = pd.DataFrame(data)
+        # Columnar inputs are scanned as-is; only large row lists are worth converting via Arrow
+        if isinstance(data, list):
+            table_data = _to_columnar(data) if len(data) >= _ARROW_MIN_ROWS else pd.DataFrame(data)
+        else:
+            table_data = data
+        self.flush(database_id)
         
         # Append data using DuckDB's efficient method
-        conn.execute(f"INSERT INTO {table_name} SELECT * FROM df")
-        conn.commit()
+        with self._checkout(database_id) as conn:
+            with _registered(conn, table_data) as view:
+                conn.execute(f"INSERT INTO {_qident(table_name)} SELECT * FROM {view}")
+            self._commit(database_id, conn)
     
-    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False) -> List[Dict[str, str]]:
+    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False, columns: Optional[Dict[str, DuckDBTypes]] = None) -> List[Dict[str, str]]:
         """Load CSV file and return schema information"""
-        conn = self._get_connection(database_id)
+        self.flush(database_id)
         
         # Check if table exists
         table_exists = self.table_exists(database_id, table_name)
@@ -308,19 +710,26 @@ class LocalBackend(Backend):
         if table_exists and not overwrite:
             raise ValueError(f"Table {table_name} already exists. Use overwrite=True to replace it.")
         
-        if table_exists and overwrite:
-            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-        
-        # Use DuckDB's CSV auto-detection to create table
-        conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM read_csv_auto('{csv_file_path}')")
-        conn.commit()
+        # Let DuckDB's parallel CSV reader populate the table directly; the path is bound
+        # as a parameter and explicit column types skip auto-detection entirely
+        if columns:
+            column_types = ", ".join(f"{_qident(name)}: '{DuckDBTypes(col_type).value}'" for name, col_type in columns.items())
+            read_csv = f"read_csv(?, header=true, auto_detect=false, parallel=true, columns={{{column_types}}})"
+        else:
+            read_csv = "read_csv(?, auto_detect=true, parallel=true)"
+        with self._checkout(database_id) as conn:
+            if table_exists and overwrite:
+                conn.execute(f"DROP TABLE IF EXISTS {_qident(table_name)}")
+            conn.execute(f"CREATE TABLE {_qident(table_name)} AS SELECT * FROM {read_csv}", [csv_file_path])
+            self._commit(database_id, conn)
+        self._invalidate_tables(database_id)
         
         # Return the schema
         return self.get_table_schema(database_id, table_name)
     
     def load_dataframe_with_schema_detection(self, database_id, dataframe, table_name: str, overwrite: bool = False) -> List[Dict[str, str]]:
         """Load DataFrame and return schema information"""
-        conn = self._get_connection(database_id)
+        self.flush(database_id)
         
         # Check if table exists
         table_exists = self.table_exists(database_id, table_name)
@@ -328,46 +737,55 @@ class LocalBackend(Backend):
         if table_exists and not overwrite:
             raise ValueError(f"Table {table_name} already exists. Use overwrite=True to replace it.")
         
-        if table_exists and overwrite:
-            conn.execute(f"DROP TABLE IF EXISTS {table_name}")
-        
-        # Create table from DataFrame using DuckDB's efficient method
-        conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM dataframe")
-        conn.commit()
+        # Create table from the DataFrame
+        table_data = _to_columnar(dataframe)
+        with self._checkout(database_id) as conn:
+            if table_exists and overwrite:
+                conn.execute(f"DROP TABLE IF EXISTS {_qident(table_name)}")
+            with _registered(conn, table_data) as view:
+                conn.execute(f"CREATE TABLE {_qident(table_name)} AS SELECT * FROM {view}")
+            self._commit(database_id, conn)
+        self._invalidate_tables(database_id)
         
         # Return the schema
         return self.get_table_schema(database_id, table_name)
     
     def apply_column_metadata_from_parcel(self, database_id: str, data: ParcelT):
-        """Apply column type changes based on provided metadata."""
-        conn = self._get_connection(database_id)
+        """Alter columns to the types declared in the parcel schema, where every value converts."""
         # Get current schema to check if columns exist
-        table_infos = [
-            self.get_table_info(database_id, table_name)
-            for table_name in data.table_name
-        ]
-        for table_info in table_infos:
-            if not table_info:
-                continue
-            for column_name, metadata in table_info.parcel_schema.items():
-                if metadata.type:
-                    if metadata.type:
-                        try:
-                            print(
-                                f"Altering column {data.table_name}.{column_name} to type {metadata.type}"
-                            )
-                            # Regular type alteration
-                            _ = conn.execute(
-                                f"ALTER TABLE {data.table_name} ALTER {column_name} TYPE {metadata.type.value}"
-                            )
-                        except Exception as e:
-                            print(
-                                f"Failed to alter column type/constraint for {data.table_name}.{column_name}: {str(e)}"
-                            )
+        current_types = {
+            column["column_name"]: column["data_type"]
+            for column in self.get_table_schema(database_id, data.table_name)
+        }
+        table = _qident(data.table_name)
+        with self._checkout(database_id) as conn:
+            for column_name, metadata in data.parcel_schema.items():
+                if not metadata.type or current_types.get(column_name, metadata.type.value) == metadata.type.value:
+                    continue
+                column = _qident(column_name)
+                try:
+                    # A failing ALTER would abort an open transaction, so check the values first
+                    unconvertible = conn.execute(
+                        f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL AND TRY_CAST({column} AS {metadata.type.value}) IS NULL"
+                    ).fetchone()[0]
+                    if unconvertible:
+                        print(
+                            f"Keeping type of {data.table_name}.{column_name}: {unconvertible} value(s) do not convert to {metadata.type.value}"
+                        )
+                        continue
+                    print(
+                        f"Altering column {data.table_name}.{column_name} to type {metadata.type.value}"
+                    )
+                    _ = conn.execute(
+                        f"ALTER TABLE {table} ALTER {column} TYPE {metadata.type.value}"
+                    )
+                    self._commit(database_id, conn)
+                except duckdb.Error as e:
+                    print(
+                        f"Failed to alter column type/constraint for {data.table_name}.{column_name}: {str(e)}"
+                    )
 
     def load_parcel(self, database_id: str, parcel: ParcelT, overwrite: bool = False) -> None:
-        conn = self._get_connection(database_id)
-        
         """
         Create a table in DuckDB from JSON data.
 
@@ -375,28 +793,21 @@ class LocalBackend(Backend):
             table_name: Name of the table to create
             data: List of JSON objects/dictionaries for the table
         """
-        if overwrite:
-            conn.execute(f"DROP TABLE IF EXISTS {parcel.table_name}")
-        
-        # Convert data to JSON string and load it directly into DuckDB
-        json_data = json.dumps(parcel.rows)
-        temp_file = f"{parcel.table_name}_data.json"
-        with open(temp_file, "w") as f:
-            _ = f.write(json_data)
-        _ = conn.execute(
-            f"""
-            CREATE TABLE {parcel.table_name} AS 
-            SELECT * FROM read_json_auto('{temp_file}');
-        """
-        )
-        # Clean up temporary file
-        os.remove(temp_file)
+        self.flush(database_id)
+        
+        # Bulk-load the rows as typed columns
+        table_data = _parcel_to_columnar(parcel)
+        with self._checkout(database_id) as conn:
+            if overwrite:
+                conn.execute(f"DROP TABLE IF EXISTS {_qident(parcel.table_name)}")
+            with _registered(conn, table_data) as view:
+                conn.execute(f"CREATE TABLE {_qident(parcel.table_name)} AS SELECT * FROM {view}")
+            self._commit(database_id, conn)
+        self._invalidate_tables(database_id)
         self.apply_column_metadata_from_parcel(database_id, parcel)
     
     def _store_table_metadata(self, conn: duckdb.DuckDBPyConnection, parcel: ParcelT) -> None:
         """Store parcel metadata in a dedicated metadata table"""
-        import json
-        
         # Create metadata table if it doesn't exist
         metadata_table_sql = """
         CREATE TABLE IF NOT EXISTS _table_metadata (
@@ -407,6 +818,7 @@ class LocalBackend(Backend):
         )
         """
         conn.execute(metadata_table_sql)
+        self._table_cache.clear()
         
         # Convert parcel schema to JSON for storage
         schema_dict = {}
@@ -425,53 +837,146 @@ class LocalBackend(Backend):
             VALUES (?, ?, ?, ?)
         """, [parcel.table_name, parcel.hint, schema_json, parcel.readonly])
     
-    def execute_sql(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None) -> pd.DataFrame:
-        conn = self._get_connection(database_id)
+    def _parse_sql_uncached(self, database_id: str, sql_query: str) -> Tuple[Tuple[duckdb.StatementType, ...], bool, Optional[frozenset[str]]]:
+        """Parse a query into its statement types, whether it is read-only, and the
+        (lower-cased) tables it reads.
         
-        # Apply access control if provided
+        Read-only is an allow-list: every statement must be a SELECT (which includes
+        DESCRIBE, SHOW, SUMMARIZE and PRAGMA table functions) or an EXPLAIN without ANALYZE.
+        Tables are None when they cannot be trusted to be complete: for anything but
+        plain SELECT/WITH statements (DESCRIBE, SHOW and PRAGMA report none, and the
+        target of an INSERT is not reported), for queries with string literals (table
+        functions take table names as strings), and when DuckDB resolves no tables.
+        """
+        with self._checkout(database_id) as conn:
+            statements = conn.extract_statements(sql_query)
+            types = tuple(statement.type for statement in statements)
+            read_only = all(
+                statement.type == duckdb.StatementType.SELECT
+                or (statement.type == duckdb.StatementType.EXPLAIN and not _ANALYZE_RE.search(statement.query))
+                for statement in statements
+            )
+            if _STRING_LITERAL_RE.search(sql_query) or not all(
+                statement.type == duckdb.StatementType.SELECT and _SELECT_RE.match(statement.query.lstrip())
+                for statement in statements
+            ):
+                return types, read_only, None
+            try:
+                tables = frozenset(
+                    table.lower() for statement in statements for table in conn.get_table_names(statement.query)
+                )
+            except duckdb.Error:
+                return types, read_only, None
+        return types, read_only, tables or None
+    
+    def _check_access(self, database_id: str, sql_query: str, access_control: Optional[AccessControlT]) -> None:
         if access_control:
-            if access_control.read_only and any(keyword in sql_query.upper() for keyword in ['INSERT', 'UPDATE', 'DELETE', 'DROP', 'CREATE', 'ALTER']):
+            read_only = access_control.read_only
+            denied_tables = access_control.denied_tables
+            if not denied_tables and not read_only:
+                return
+            _, is_read_only, tables = self._parse_sql(database_id, sql_query)
+            
+            if read_only and not is_read_only:
                 raise ValueError("Write operations not allowed with read-only access control")
             
-            if access_control.denied_tables:
-                for table in access_control.denied_tables:
-                    if table in sql_query:
+            if denied_tables:
+                for table in denied_tables:
+                    # Fall back to a plain substring match when the tables could not be resolved
+                    if (table.lower() in tables) if tables is not None else (table in sql_query):
                         raise ValueError(f"Access denied to table: {table}")
+    
+    def _apply_row_limit(self, database_id: str, sql_query: str, access_control: Optional[AccessControlT]) -> str:
+        """Push the row limit into the query so DuckDB stops producing rows early."""
+        row_limit = access_control.row_limit if access_control else None
+        if not row_limit:
+            return sql_query
+        query = sql_query.strip().rstrip(';')
+        # Only a single SELECT can be wrapped as a subquery
+        statement_types, _, _ = self._parse_sql(database_id, sql_query)
+        if statement_types != (duckdb.StatementType.SELECT,) or not _SELECT_RE.match(query):
+            return sql_query
+        # The newline keeps a trailing line comment from swallowing the closing parenthesis
+        return f"SELECT * FROM ({query}\n) _lim LIMIT {int(row_limit)}"
+    
+    def execute_sql(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None) -> pd.DataFrame:
+        # Apply access control if provided; both parse the query on a cursor of their own,
+        # so they must run before this call checks one out
+        self._check_access(database_id, sql_query, access_control)
+        query = self._apply_row_limit(database_id, sql_query, access_control)
+        
+        # Make buffered rows visible to the query
+        self.flush(database_id)
         
         # Execute query
-        if params:
-            result = conn.execute(sql_query, list(params.values()))
-        else:
-            result = conn.execute(sql_query)
+        with self._checkout(database_id) as conn:
+            if params:
+                result = conn.execute(query, list(params.values()))
+            else:
+                result = conn.execute(query)
+            
+            df = result.df()
         
-        df = result.df()
+        # Arbitrary SQL may have created or dropped tables
+        if _DDL_RE.search(sql_query):
+            self._invalidate_tables(database_id)
         
-        # Apply row limit if specified
-        if access_control and access_control.row_limit:
-            df = df.head(access_control.row_limit)
+        # Row limit for statements that could not be rewritten
+        row_limit = access_control.row_limit if access_control else None
+        if row_limit:
+            df = df.head(row_limit)
         
         return df
     
+    def execute_sql_batches(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None, rows_per_batch: int = 100_000) -> Iterator[Any]:
+        self._check_access(database_id, sql_query, access_control)
+        query = self._apply_row_limit(database_id, sql_query, access_control)
+        self.flush(database_id)
+        
+        # The result lives on its cursor until the consumer is done, so stream from a cursor of
+        # its own rather than a pooled one that a slow or abandoned consumer would hold on to
+        tx_conn = self._active_transaction(database_id)
+        conn = tx_conn if tx_conn is not None else self._get_connection(database_id).cursor()
+        try:
+            if params:
+                result = conn.execute(query, list(params.values()))
+            else:
+                result = conn.execute(query)
+            
+            yield from result.fetch_record_batch(rows_per_batch)
+        finally:
+            # Runs on exhaustion, on close() and when an abandoned generator is collected
+            if tx_conn is None:
+                conn.close()
+    
     def list_databases(self) -> List[str]:
         if not self.api_key:
             raise ValueError("API key is required")
         
+        if self.settings.in_memory:
+            return list(self._connections)
+        
         base_path = self.settings.database_path or "databases"
         api_key_dir = os.path.join(base_path, self.api_key)
         
+        # Serve repeated calls from a short-lived snapshot of the directory
+        cached = self._db_list_cache
+        if cached is not None and time.monotonic() - cached[0] < _DB_LIST_TTL_SECONDS:
+            return list(cached[1])
+        
         if not os.path.exists(api_key_dir):
             return []
         
-        db_files = glob.glob(os.path.join(api_key_dir, "*.duckdb"))
-        return [Path(f).stem for f in db_files]
+        with os.scandir(api_key_dir) as entries:
+            databases = [entry.name[:-7] for entry in entries if entry.name.endswith(".duckdb") and entry.is_file()]
+        self._db_list_cache = (time.monotonic(), databases)
+        return list(databases)
     
     def list_tables(self, database_id: str) -> List[str]:
         if not self.database_exists(database_id):
             return []
         
-        conn = self._get_connection(database_id)
-        result = conn.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'main'")
-        return [row[0] for row in result.fetchall()]
+        return sorted(self._get_tables(database_id))
 
 
 class ModalBackend(Backend):
@@ -502,23 +1007,39 @@ class ModalBackend(Backend):
         # TODO: Implement modal backend table info retrieval
         raise NotImplementedError("Modal backend not yet implemented")
     
+    def get_sample_rows(self, database_id: str, table_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        # TODO: Implement modal backend sample row retrieval
+        raise NotImplementedError("Modal backend not yet implemented")
+    
     def add_row(self, database_id: str, table_name: str, row_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> None:
         # TODO: Implement modal backend row addition
         raise NotImplementedError("Modal backend not yet implemented")
     
+    def add_rows(self, database_id: str, table_name: str, rows: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+        # TODO: Implement modal backend batch row addition
+        raise NotImplementedError("Modal backend not yet implemented")
+    
+    def flush(self, database_id: Optional[str] = None) -> None:
+        # TODO: Implement modal backend buffered write flush
+        raise NotImplementedError("Modal backend not yet implemented")
+    
+    def transaction(self, database_id: str) -> Iterator[None]:
+        # TODO: Implement modal backend transactions
+        raise NotImplementedError("Modal backend not yet implemented")
+    
     def update_row_by_id(self, database_id: str, table_name: str, row_id: str, update_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> bool:
         # TODO: Implement modal backend row update
         raise NotImplementedError("Modal backend not yet implemented")
     
-    def overwrite_table(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def overwrite_table(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         # TODO: Implement modal backend table overwrite
         raise NotImplementedError("Modal backend not yet implemented")
     
-    def append_data(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def append_data(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         # TODO: Implement modal backend data append
         raise NotImplementedError("Modal backend not yet implemented")
     
-    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False) -> List[Dict[str, str]]:
+    def load_csv_with_schema_detection(self, database_id: str, csv_file_path: str, table_name: str, overwrite: bool = False, columns: Optional[Dict[str, DuckDBTypes]] = None) -> List[Dict[str, str]]:
         # TODO: Implement modal backend CSV loading
         raise NotImplementedError("Modal backend not yet implemented")
 
@@ -534,6 +1055,10 @@ class ModalBackend(Backend):
         # TODO: Implement modal backend SQL execution
         raise NotImplementedError("Modal backend not yet implemented")
     
+    def execute_sql_batches(self, database_id: str, sql_query: str, params: Optional[Dict[str, Any]] = None, access_control: Optional[AccessControlT] = None, rows_per_batch: int = 100_000) -> Iterator[Any]:
+        # TODO: Implement modal backend streaming SQL execution
+        raise NotImplementedError("Modal backend not yet implemented")
+    
     def list_databases(self) -> List[str]:
         # TODO: Implement modal backend database listing
         raise NotImplementedError("Modal backend not yet implemented")
@@ -543,10 +1068,15 @@ class ModalBackend(Backend):
         raise NotImplementedError("Modal backend not yet implemented")
 
 
+_BACKENDS: Dict[str, type[Backend]] = {
+    "local": LocalBackend,
+    "modal": ModalBackend,
+}
+
+
 def get_backend(settings: SettingsT, api_key: Optional[str] = None) -> Backend:
-    if settings.backend == "local":
-        return LocalBackend(settings, api_key)
-    elif settings.backend == "modal":
-        return ModalBackend(settings, api_key)
-    else:
-        raise ValueError(f"Unknown backend: {settings.backend}")
\ No newline at end of file
+    try:
+        backend_cls = _BACKENDS[settings.backend]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {settings.backend}") from None
+    return backend_cls(settings, api_key)
\ No newline at end of file
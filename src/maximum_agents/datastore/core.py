@@ -1,9 +1,41 @@
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, List, Iterator
+from contextlib import contextmanager
 import pandas as pd
 import os
+import functools
 from pathlib import Path
+from types import MappingProxyType
 from .types import SettingsT, ParcelT, AccessControlT, ColumnMetadataT, DuckDBTypes, TableInfoT
-from .backends import get_backend, Backend
+from .backends import get_backend, Backend, TableDataT
+
+# Convert DuckDB types to our enum types
+_TYPE_MAPPING = MappingProxyType({
+    'INTEGER': DuckDBTypes.INTEGER,
+    'BIGINT': DuckDBTypes.BIGINT,
+    'DOUBLE': DuckDBTypes.DOUBLE,
+    'VARCHAR': DuckDBTypes.VARCHAR,
+    'BOOLEAN': DuckDBTypes.BOOLEAN,
+    'DATE': DuckDBTypes.DATE,
+    'TIMESTAMP': DuckDBTypes.TIMESTAMP,
+    'FLOAT': DuckDBTypes.FLOAT,
+    'DECIMAL': DuckDBTypes.DECIMAL,
+})
+
+
+@functools.lru_cache(maxsize=256)
+def _auto_description(col_type: str, source: str) -> str:
+    return f"Auto-detected {col_type} column from {source}"
+
+
+def _parcel_schema(schema_result: List[Dict[str, str]], source: str) -> Dict[str, ColumnMetadataT]:
+    """Build parcel column metadata from a backend schema listing."""
+    return {
+        s["column_name"]: ColumnMetadataT(
+            type=_TYPE_MAPPING.get(s["data_type"], DuckDBTypes.VARCHAR),
+            description=_auto_description(s["data_type"], source)
+        )
+        for s in schema_result
+    }
 
 
 class MaximumDataStore:
@@ -56,6 +88,35 @@ class MaximumDataStore:
         
         return self.backend.execute_sql(database_id, sql_query, optional_params, access_control)
     
+    def sql_engine_batches(
+        self,
+        database_id: str,
+        sql_query: str,
+        optional_params: Optional[Dict[str, Any]] = None,
+        access_control: Optional[AccessControlT] = None,
+        rows_per_batch: int = 100_000
+    ) -> Iterator[Any]:
+        """
+        Execute SQL query and stream the results without materializing a DataFrame.
+        
+        The query runs on a dedicated cursor that is released when the iterator is exhausted
+        or closed; close it (e.g. with contextlib.closing) when stopping early.
+        
+        Args:
+            database_id: Unique identifier for the database
+            sql_query: SQL query to execute
+            optional_params: Optional parameters for the query
+            access_control: Access control settings
+            rows_per_batch: Maximum number of rows per yielded batch
+        
+        Returns:
+            Iterator[pyarrow.RecordBatch]: Query results in batches (requires pyarrow)
+        
+        Raises:
+            ValueError: If access control violations
+        """
+        return self.backend.execute_sql_batches(database_id, sql_query, optional_params, access_control, rows_per_batch)
+    
     def table_exists(self, database_id: str, table_name: str) -> bool:
         """
         Check if a table exists in the specified database.
@@ -113,6 +174,11 @@ class MaximumDataStore:
         """
         Add a single row to a table.
         
+        The row is written immediately unless settings.write_batch_size is above 1. Then
+        rows are buffered and written in batches; they become visible to queries issued
+        through this datastore immediately, and to other readers after flush(). Rows that
+        fail to convert are reported by the next add_row or flush call.
+        
         Args:
             database_id: Unique identifier for the database
             table_name: Name of the table
@@ -120,13 +186,67 @@ class MaximumDataStore:
             access_control: Access control settings
         
         Raises:
-            ValueError: If database doesn't exist, table doesn't exist, or access control violations
+            ValueError: If database doesn't exist, table doesn't exist, access control violations,
+                or rows buffered earlier could not be written
         """
         if not self.backend.database_exists(database_id):
             raise ValueError(f"Database {database_id} does not exist")
         
         self.backend.add_row(database_id, table_name, row_data, access_control)
     
+    def add_rows(self, database_id: str, table_name: str, rows: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+        """
+        Add multiple rows to a table in batched inserts.
+        
+        Args:
+            database_id: Unique identifier for the database
+            table_name: Name of the table
+            rows: List of dictionaries of column names to values
+            access_control: Access control settings
+        
+        Raises:
+            ValueError: If database doesn't exist, table doesn't exist, or access control violations
+        """
+        if not self.backend.database_exists(database_id):
+            raise ValueError(f"Database {database_id} does not exist")
+        
+        self.backend.add_rows(database_id, table_name, rows, access_control)
+    
+    def flush(self, database_id: Optional[str] = None) -> None:
+        """
+        Write out rows buffered by add_row.
+        
+        Valid rows of a batch are written even if other rows in it fail.
+        
+        Args:
+            database_id: Only flush rows for this database; flush everything if None
+        
+        Raises:
+            ValueError: If buffered rows could not be written
+        """
+        self.backend.flush(database_id)
+    
+    @contextmanager
+    def transaction(self, database_id: str) -> Iterator[None]:
+        """
+        Group writes made by this thread into a single transaction.
+        
+        add_row, add_rows, update_row_by_id, append_data and overwrite_table skip their
+        per-call commit inside the block; everything is committed on exit, or rolled back
+        if the block raises.
+        
+        Args:
+            database_id: Unique identifier for the database
+        
+        Raises:
+            ValueError: If database doesn't exist
+        """
+        if not self.backend.database_exists(database_id):
+            raise ValueError(f"Database {database_id} does not exist")
+        
+        with self.backend.transaction(database_id):
+            yield
+    
     def update_row_by_id(self, database_id: str, table_name: str, row_id: str, update_data: Dict[str, Any], access_control: Optional[AccessControlT] = None) -> bool:
         """
         Update a row in a table by its ID.
@@ -149,14 +269,14 @@ class MaximumDataStore:
         
         return self.backend.update_row_by_id(database_id, table_name, row_id, update_data, access_control)
     
-    def overwrite_table(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def overwrite_table(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         """
         Completely replace a table's contents with new data.
         
         Args:
             database_id: Unique identifier for the database
             table_name: Name of the table
-            data: List of dictionaries representing rows
+            data: List of dictionaries representing rows, or a pandas DataFrame / pyarrow Table
             access_control: Access control settings
         
         Raises:
@@ -167,14 +287,14 @@ class MaximumDataStore:
         
         self.backend.overwrite_table(database_id, table_name, data, access_control)
     
-    def append_data(self, database_id: str, table_name: str, data: List[Dict[str, Any]], access_control: Optional[AccessControlT] = None) -> None:
+    def append_data(self, database_id: str, table_name: str, data: TableDataT, access_control: Optional[AccessControlT] = None) -> None:
         """
         Append data to an existing table.
         
         Args:
             database_id: Unique identifier for the database
             table_name: Name of the table
-            data: List of dictionaries representing rows to append
+            data: List of dictionaries representing rows to append, or a pandas DataFrame / pyarrow Table
             access_control: Access control settings
         
         Raises:
@@ -191,7 +311,8 @@ class MaximumDataStore:
         csv_file_path: str, 
         table_name: str,
         overwrite: bool = False,
-        hint: Optional[str] = None
+        hint: Optional[str] = None,
+        columns: Optional[Dict[str, DuckDBTypes]] = None
     ) -> ParcelT:
         """
         Load a CSV file into the database with automatic schema detection.
@@ -202,6 +323,7 @@ class MaximumDataStore:
             table_name: Name for the database table
             overwrite: Whether to overwrite existing table if it exists
             hint: Optional hint about the table contents
+            columns: Optional column name to type mapping; skips type auto-detection when given
             
         Returns:
             ParcelT: The created parcel with detected schema
@@ -218,35 +340,13 @@ class MaximumDataStore:
             self.backend.create_database(database_id)
         
         # Load CSV using backend method
-        schema_result = self.backend.load_csv_with_schema_detection(database_id, csv_file_path, table_name, overwrite)
-        
-        # Convert DuckDB types to our enum types
-        type_mapping = {
-            'INTEGER': DuckDBTypes.INTEGER,
-            'BIGINT': DuckDBTypes.BIGINT,
-            'DOUBLE': DuckDBTypes.DOUBLE,
-            'VARCHAR': DuckDBTypes.VARCHAR,
-            'BOOLEAN': DuckDBTypes.BOOLEAN,
-            'DATE': DuckDBTypes.DATE,
-            'TIMESTAMP': DuckDBTypes.TIMESTAMP,
-            'FLOAT': DuckDBTypes.FLOAT,
-            'DECIMAL': DuckDBTypes.DECIMAL,
-        }
+        schema_result = self.backend.load_csv_with_schema_detection(database_id, csv_file_path, table_name, overwrite, columns)
         
         # Build schema metadata
-        parcel_schema = {}
-        for schema_info in schema_result:
-            col_name = schema_info["column_name"]
-            col_type = schema_info["data_type"]
-            mapped_type = type_mapping.get(col_type, DuckDBTypes.VARCHAR)
-            parcel_schema[col_name] = ColumnMetadataT(
-                type=mapped_type,
-                description=f"Auto-detected {col_type} column from CSV"
-            )
+        parcel_schema = _parcel_schema(schema_result, "CSV")
         
         # Get sample data for the parcel
-        sample_df = self.sql_engine(database_id, f"SELECT * FROM {table_name} LIMIT 100")
-        sample_rows = sample_df.to_dict('records')
+        sample_rows = self.backend.get_sample_rows(database_id, table_name, 100)
         
         # Create and return the parcel
         parcel = ParcelT(
@@ -290,29 +390,8 @@ class MaximumDataStore:
         # Load DataFrame using backend method
         schema_result = self.backend.load_dataframe_with_schema_detection(database_id, dataframe, table_name, overwrite)
         
-        # Convert DuckDB types to our enum types
-        type_mapping = {
-            'INTEGER': DuckDBTypes.INTEGER,
-            'BIGINT': DuckDBTypes.BIGINT,
-            'DOUBLE': DuckDBTypes.DOUBLE,
-            'VARCHAR': DuckDBTypes.VARCHAR,
-            'BOOLEAN': DuckDBTypes.BOOLEAN,
-            'DATE': DuckDBTypes.DATE,
-            'TIMESTAMP': DuckDBTypes.TIMESTAMP,
-            'FLOAT': DuckDBTypes.FLOAT,
-            'DECIMAL': DuckDBTypes.DECIMAL,
-        }
-        
         # Build schema metadata
-        parcel_schema = {}
-        for schema_info in schema_result:
-            col_name = schema_info["column_name"]
-            col_type = schema_info["data_type"]
-            mapped_type = type_mapping.get(col_type, DuckDBTypes.VARCHAR)
-            parcel_schema[col_name] = ColumnMetadataT(
-                type=mapped_type,
-                description=f"Auto-detected {col_type} column from DataFrame"
-            )
+        parcel_schema = _parcel_schema(schema_result, "DataFrame")
         
         # Get sample data for the parcel
         sample_rows = dataframe.head(100).to_dict('records')
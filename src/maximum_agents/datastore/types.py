@@ -89,6 +89,14 @@ class SettingsT(BaseModel):
     database_path: Optional[str] = None
     modal_endpoint: Optional[str] = None
     timeout: int = 30
+    pool_size: Optional[int] = None  # DuckDB cursors per database (default: CPU count, at most 4)
+    write_batch_size: int = 1  # Above 1, add_row buffers rows and writes them once this many are buffered for a table
+    write_max_wait_ms: int = 100  # ...or once the oldest buffered row has waited this long
+    in_memory: bool = False  # Keep databases in memory only (nothing is written to database_path)
+    shared_memory: bool = False  # With in_memory, share each database with other backends in this process
+    duckdb_threads: Optional[int] = None  # Worker threads per database (default: a quarter of the CPUs)
+    duckdb_memory_limit: Optional[str] = None  # e.g. "2GB"; DuckDB's own default when unset
+    preserve_insertion_order: bool = False  # Keeping row order makes large CREATE TABLE AS / INSERT slower
 
 
 class AccessControlT(BaseModel):
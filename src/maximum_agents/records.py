@@ -1,39 +1,43 @@
-from pydantic import BaseModel
-from enum import Enum
-from typing import Union, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from enum import StrEnum
+from typing import Annotated, Literal, Union, Optional, Dict, Any
 
-class PartType(str, Enum):
+class PartType(StrEnum):
     THINKING = "thinking"
     CODE = "code"
     OUTPUT = "output"
     TOOL_CALL = "tool_call"
 class ThinkingPartT(BaseModel):
-    type: PartType = PartType.THINKING
+    model_config = ConfigDict(frozen=True)
+    type: Literal[PartType.THINKING] = PartType.THINKING
     content: str
     def __str__(self) -> str:
         return f"Thinking: {self.content}"
     
 class CodePartT(BaseModel):
-    type: PartType = PartType.CODE
+    model_config = ConfigDict(frozen=True)
+    type: Literal[PartType.CODE] = PartType.CODE
     content: str
     def __str__(self) -> str:
         return f"Code: {self.content}"
     
 class OutputPartT(BaseModel):
-    type: PartType = PartType.OUTPUT
+    model_config = ConfigDict(frozen=True)
+    type: Literal[PartType.OUTPUT] = PartType.OUTPUT
     content: str
     def __str__(self) -> str:
         return f"Output: {self.content}"
     
 class ToolCallT(BaseModel):
-    type: PartType = PartType.TOOL_CALL
+    model_config = ConfigDict(frozen=True)
+    type: Literal[PartType.TOOL_CALL] = PartType.TOOL_CALL
     name: str
     arguments: Dict[str, Any]
     
     def to_str(self) -> str:
         return f"Tool: {self.name}\nArguments: {self.arguments}"
 
-class OutputType(str, Enum):
+class OutputType(StrEnum):
     BASIC = "basic"
 
 class BasicAnswerT(BaseModel):
@@ -43,8 +47,10 @@ class ResultT[T: BaseModel](BaseModel):
     output: OutputType = OutputType.BASIC
     answer: T
 
-PartT = Union[ThinkingPartT, CodePartT, OutputPartT, ToolCallT]
+# Discriminated on "type", so validation picks the part model directly instead of trying each
+PartT = Annotated[Union[ThinkingPartT, CodePartT, OutputPartT, ToolCallT], Field(discriminator="type")]
 
 class StepT(BaseModel):
+    model_config = ConfigDict(frozen=True)
     step_number: Optional[int] = None
     parts: list[PartT]
\ No newline at end of file
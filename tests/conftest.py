@@ -0,0 +1,18 @@
+import pytest
+
+from maximum_agents.datastore.backends import LocalBackend
+from maximum_agents.datastore.types import SettingsT
+
+
+@pytest.fixture
+def make_backend(tmp_path):
+    def make(**settings) -> LocalBackend:
+        return LocalBackend(SettingsT(database_path=str(tmp_path), **settings), api_key="test")
+    return make
+
+
+@pytest.fixture
+def backend(make_backend) -> LocalBackend:
+    backend = make_backend()
+    backend.overwrite_table("db", "t", [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}])
+    return backend
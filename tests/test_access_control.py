@@ -0,0 +1,59 @@
+import pytest
+
+from maximum_agents.datastore.types import AccessControlT
+
+
+def _row_count(backend) -> int:
+    return int(backend.execute_sql("db", "SELECT count(*) AS n FROM t")["n"][0])
+
+
+@pytest.mark.parametrize("sql", [
+    "INSERT INTO t VALUES (3, 'c')",
+    "DELETE FROM t",
+    "EXPLAIN ANALYZE DELETE FROM t",
+    "explain analyse DELETE FROM t",
+    "/* comment */ EXPLAIN ANALYZE DELETE FROM t",
+    "PREPARE p AS DELETE FROM t",
+    "EXECUTE p",
+    "CALL pragma_version()",
+    "SET threads = 1",
+    "SELECT 1; DELETE FROM t",
+    "WITH x AS (SELECT 1) DELETE FROM t",
+])
+def test_read_only_rejects_anything_but_reads(backend, sql):
+    with pytest.raises(ValueError, match="read-only"):
+        backend.execute_sql("db", sql, access_control=AccessControlT(read_only=True))
+    assert _row_count(backend) == 2
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM t",
+    "FROM t",
+    "DESCRIBE t",
+    "EXPLAIN SELECT * FROM t",
+])
+def test_read_only_allows_reads(backend, sql):
+    backend.execute_sql("db", sql, access_control=AccessControlT(read_only=True))
+
+
+def test_denied_tables(backend):
+    backend.overwrite_table("db", "secret", [{"id": 1}])
+    with pytest.raises(ValueError, match="Access denied"):
+        backend.execute_sql("db", "SELECT * FROM secret", access_control=AccessControlT(denied_tables=["secret"]))
+    result = backend.execute_sql("db", "SELECT * FROM t", access_control=AccessControlT(denied_tables=["secret"]))
+    assert len(result) == 2
+
+
+@pytest.mark.parametrize("sql", [
+    "DESCRIBE secret",
+    "SHOW secret",
+    "(DESCRIBE secret)",
+    "SUMMARIZE secret",
+    "SELECT * FROM pragma_table_info('secret')",
+    "SELECT * FROM t, pragma_table_info('secret')",
+    "FROM secret",
+])
+def test_denied_tables_without_resolved_tables(backend, sql):
+    backend.overwrite_table("db", "secret", [{"id": 1}])
+    with pytest.raises(ValueError, match="Access denied"):
+        backend.execute_sql("db", sql, access_control=AccessControlT(denied_tables=["secret"]))
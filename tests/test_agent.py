@@ -0,0 +1,224 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+from litellm.exceptions import InternalServerError
+from smolagents import ChatMessageStreamDelta
+
+from pydantic import BaseModel
+
+from maximum_agents.base import BaseAgent, CachedAnthropicModel, RetryingModel, changes_process_state
+from maximum_agents.builders.builder import AgentBuilder
+from maximum_agents.records import CodePartT, OutputPartT, ThinkingPartT
+
+
+def _final_answer(answer: str) -> str:
+    return f'Thought: done\n<code>\nfinal_answer(answer={{"answer": "{answer}"}})\n</code>'
+
+
+class FakeClient:
+    """Stands in for the litellm module: replays scripted completions, raising exceptions.
+
+    outputs is a list of completions, or a function from the request messages to one.
+    """
+
+    def __init__(self, outputs):
+        self.outputs = outputs if callable(outputs) else list(outputs)
+        self.calls = []
+
+    def completion(self, **kwargs):
+        self.calls.append(kwargs)
+        output = self.outputs(kwargs["messages"]) if callable(self.outputs) else self.outputs.pop(0)
+        if isinstance(output, Exception):
+            raise output
+        if kwargs.get("stream"):
+            return iter([
+                SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=output, tool_calls=None))]),
+            ])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=output, tool_calls=None))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+        )
+
+
+def _model(outputs, model_cls=RetryingModel, model_id="openai/gpt-4o-mini", **kwargs):
+    model = model_cls(model_id=model_id, api_key="test", **kwargs)
+    model.client = FakeClient(outputs)
+    return model
+
+
+def _agent(model, **kwargs):
+    return BaseAgent(system_prompt="Answer the question.", tools=[], additional_authorized_imports=[], model=model, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr("maximum_agents.exponential_backoff.time.sleep", lambda seconds: None)
+
+
+def _server_error():
+    return InternalServerError("overloaded", llm_provider="openai", model="gpt-4o-mini")
+
+
+@pytest.mark.parametrize("stream_deltas", [False, True])
+def test_retrying_model_retries_transient_errors(stream_deltas):
+    model = _model([_server_error(), _server_error(), _final_answer("42")])
+    result = _agent(model, stream_deltas=stream_deltas).run("What is 6 * 7?", lambda step: None)
+    assert result.answer.answer == "42"
+    assert len(model.client.calls) == 3
+
+
+def _cache_controls(messages):
+    return [
+        (message["role"], block["cache_control"]["ttl"])
+        for message in messages
+        for block in message["content"]
+        if "cache_control" in block
+    ]
+
+
+def test_cached_anthropic_model_marks_breakpoints():
+    model = _model(
+        ['Thought: look\n<code>\nprint("observed")\n</code>', _final_answer("done")],
+        model_cls=CachedAnthropicModel,
+        model_id="anthropic/claude-sonnet-4-20250514",
+        min_token_count=1,
+    )
+    _agent(model).run("Look, then answer.", lambda step: None)
+    first, second = (call["messages"] for call in model.client.calls)
+    assert _cache_controls(first) == [("system", "1h"), ("user", "5m")]
+    # The observation (a tool response, sent as a user message) is cached too; it follows
+    # the 5m task breakpoint, so its TTL is shortened to match
+    assert _cache_controls(second) == [("system", "1h"), ("user", "5m"), ("user", "5m")]
+    assert "observed" in second[-1]["content"][-1]["text"]
+
+
+def test_cached_anthropic_model_skips_small_prefixes():
+    model = _model([_final_answer("done")], model_cls=CachedAnthropicModel, model_id="anthropic/claude-sonnet-4-20250514", min_token_count=10**6)
+    _agent(model).run("Answer.", lambda step: None)
+    assert _cache_controls(model.client.calls[0]["messages"]) == []
+
+
+def test_empty_stream_deltas_format_to_separate_steps():
+    agent = _agent(_model([]))
+    first, second = (agent._format_step(ChatMessageStreamDelta(content=""), 1) for _ in range(2))
+    first.parts.append(ThinkingPartT(content="mutated"))
+    assert second.parts == []
+
+
+def test_reused_agent_starts_each_run_clean():
+    model = _model([
+        'Thought: define\n<code>\ndef helper():\n    return "leaked function"\nvalue = "leaked variable"\n</code>',
+        _final_answer("first"),
+        'Thought: probe\n<code>\ntry:\n    print(helper())\nexcept Exception:\n    print("no helper")\ntry:\n    print(value)\nexcept Exception:\n    print("no value")\n</code>',
+        _final_answer("second"),
+    ])
+    agent = _agent(model)
+    agent.run("Define a helper.", lambda step: None)
+    steps = []
+    agent.run("Use the helper.", steps.append)
+    outputs = " ".join(part.content for step in steps for part in step.parts if isinstance(part, OutputPartT))
+    assert "leaked" not in outputs
+    assert "no helper" in outputs and "no value" in outputs
+    assert len(agent._agent_cache) == 1
+
+
+
+def test_agent_is_reused_until_its_inputs_change():
+    model = _model([_final_answer("a"), _final_answer("b"), _final_answer("c")])
+    agent = _agent(model)
+    agent.run("First.", lambda step: None)
+    first_agent = agent.agent
+    agent.run("Second.", lambda step: None)
+    assert agent.agent is first_agent
+    agent.hooks.add_codeagent_kwargs_hook(lambda: {"verbosity_level": 0})
+    agent.run("Third.", lambda step: None)
+    assert agent.agent is not first_agent
+    assert len(agent._agent_cache) == 2
+
+
+def test_agent_with_remote_executor_is_not_cached():
+    agent = _agent(_model([]))
+    assert agent._agent_cache_key({"executor_type": "docker"}) is None
+    assert agent._agent_cache_key({"executor_kwargs": {"unhashable": []}}) is None
+    assert agent._agent_cache_key({}) is not None
+
+
+def test_steps_are_formatted_into_parts():
+    model = _model([
+        'Thought: compute it\n<code>\nprint(6 * 7)\n</code>',
+        _final_answer("42"),
+    ])
+    steps = []
+    _agent(model).run("What is 6 * 7?", steps.append)
+    parts = steps[0].parts
+    assert [type(part) for part in parts] == [ThinkingPartT, CodePartT, OutputPartT]
+    assert parts[0].content.startswith("Thought: compute it")
+    assert parts[1].content == "print(6 * 7)"
+    assert "42" in parts[2].content
+
+
+class Measurement(BaseModel):
+    value: int
+
+
+def test_invalid_final_answer_is_sent_back_to_the_model():
+    model = _model([
+        'Thought: answer\n<code>\nfinal_answer(answer={"value": "many"})\n</code>',
+        'Thought: fix it\n<code>\nfinal_answer(answer={"value": 3})\n</code>',
+    ])
+    result = _agent(model, final_answer_model=Measurement).run("How many?", lambda step: None)
+    assert result.answer == Measurement(value=3)
+    assert len(model.client.calls) == 2
+
+
+def _echo_task(messages):
+    task = re.search(r"Task: (\S+)", messages[1]["content"][0]["text"]).group(1)
+    return _final_answer(task)
+
+
+def test_run_many_returns_results_in_task_order():
+    agent = _agent(_model(_echo_task))
+    tasks = [f"task-{i}" for i in range(8)]
+    results = agent.run_many_sync(tasks, lambda step: None, max_concurrency=3)
+    assert [result.answer.answer for result in results] == tasks
+
+
+def test_run_many_does_not_block_the_event_loop():
+    agent = _agent(_model(_echo_task))
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticking = asyncio.create_task(ticker())
+        results = await agent.run_many(["a", "b"], lambda step: None, max_concurrency=2)
+        ticking.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert [result.answer.answer for result in results] == ["a", "b"]
+    assert ticks > 0
+
+
+def test_run_many_rejects_working_directory_hooks():
+    agent = AgentBuilder().put_agent_in_temporary_dir().build_agent(
+        system_prompt="Answer the question.",
+        tools=[],
+        additional_authorized_imports=[],
+        model=_model([]),
+        final_answer_model=Measurement,
+        final_answer_description="The measurement.",
+    )
+    with pytest.raises(ValueError, match="process-wide state"):
+        agent.run_many_sync(["a"], lambda step: None)
+    custom = _agent(_model([]))
+    custom.hooks.add_pre_run_hook(changes_process_state(lambda task: task))
+    with pytest.raises(ValueError, match="process-wide state"):
+        custom.run_many_sync(["a"], lambda step: None)
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from maximum_agents.datastore.backends import LocalBackend
+from maximum_agents.datastore.types import SettingsT
+
+
+@pytest.fixture
+def int_table(make_backend):
+    def make(**settings) -> LocalBackend:
+        backend = make_backend(**settings)
+        backend.overwrite_table("db", "t", [{"id": 0, "n": 0}])
+        return backend
+    return make
+
+
+def _ids(backend) -> list[int]:
+    return sorted(backend.execute_sql("db", "SELECT id FROM t")["id"].tolist())
+
+
+def test_unbuffered_by_default(int_table):
+    backend = int_table()
+    backend.add_row("db", "t", {"id": 1, "n": 1})
+    assert backend._write_buffers == {}
+    with pytest.raises(Exception):
+        backend.add_row("db", "t", {"id": 2, "n": "not-a-number"})
+    assert _ids(backend) == [0, 1]
+
+
+def test_failed_batch_keeps_valid_rows_and_raises(int_table):
+    backend = int_table(write_batch_size=100, write_max_wait_ms=60_000)
+    backend.add_row("db", "t", {"id": 1, "n": 1})
+    backend.add_row("db", "t", {"id": 2, "n": "not-a-number"})
+    backend.add_row("db", "t", {"id": 3, "n": 3})
+    with pytest.raises(ValueError, match="1 buffered row"):
+        backend.flush()
+    assert _ids(backend) == [0, 1, 3]
+
+
+def test_background_flush_failure_is_reported_to_next_call(int_table):
+    backend = int_table(write_batch_size=100, write_max_wait_ms=10)
+    backend.add_row("db", "t", {"id": 1, "n": "not-a-number"})
+    backend.add_row("db", "t", {"id": 2, "n": 2})
+    deadline = time.monotonic() + 5
+    while backend._write_buffers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # The timer pops the buffer under the flush lock; wait for its inserts to finish
+    with backend._flush_lock:
+        pass
+    with pytest.raises(ValueError, match="buffered row"):
+        backend.add_row("db", "t", {"id": 3, "n": 3})
+    # Reported once; the valid row of the failed batch was written
+    backend.flush()
+    assert _ids(backend) == [0, 2]
+
+
+def test_buffered_rows_are_written_at_exit(tmp_path):
+    script = textwrap.dedent(f"""
+        from maximum_agents.datastore.backends import LocalBackend
+        from maximum_agents.datastore.types import SettingsT
+
+        backend = LocalBackend(SettingsT(database_path={str(tmp_path)!r}, write_batch_size=100, write_max_wait_ms=60_000), api_key="test")
+        backend.overwrite_table("db", "t", [{{"id": 0}}])
+        backend.add_row("db", "t", {{"id": 1}})
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True)
+    backend = LocalBackend(SettingsT(database_path=str(tmp_path)), api_key="test")
+    assert _ids(backend) == [0, 1]
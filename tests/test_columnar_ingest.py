@@ -0,0 +1,62 @@
+import pandas as pd
+
+
+def _table(backend, table_name: str = "t") -> pd.DataFrame:
+    return backend.execute_sql("db", f"SELECT * FROM {table_name} ORDER BY a")
+
+
+def test_overwrite_unions_row_keys(make_backend):
+    backend = make_backend()
+    backend.overwrite_table("db", "t", [{"a": 1}, {"a": 2, "b": "x"}])
+    df = _table(backend)
+    assert list(df.columns) == ["a", "b"]
+    assert df["b"].tolist()[1] == "x"
+
+
+def test_overwrite_mixed_value_types(make_backend):
+    backend = make_backend()
+    backend.overwrite_table("db", "t", [{"a": 1}, {"a": "x"}])
+    assert backend.get_table_schema("db", "t") == [{"column_name": "a", "data_type": "VARCHAR"}]
+    assert sorted(backend.execute_sql("db", "SELECT a FROM t")["a"].tolist()) == ["1", "x"]
+
+
+def test_overwrite_uniform_rows_keep_types(make_backend):
+    backend = make_backend()
+    backend.overwrite_table("db", "t", [{"a": 1, "b": None}, {"a": 2, "b": 2.5}])
+    assert backend.get_table_schema("db", "t") == [
+        {"column_name": "a", "data_type": "BIGINT"},
+        {"column_name": "b", "data_type": "DOUBLE"},
+    ]
+
+
+def test_large_append_with_non_uniform_rows(make_backend):
+    backend = make_backend()
+    backend.overwrite_table("db", "t", [{"a": -1, "b": "seed"}])
+    # Large enough to take the Arrow path; the first row lacks "b" and one "b" is not a string
+    rows = [{"a": 0}] + [{"a": i, "b": "x"} for i in range(1, 10_000)] + [{"a": 10_000, "b": 5}]
+    backend.append_data("db", "t", rows)
+    df = _table(backend)
+    assert len(df) == 10_002
+    assert df["b"].isna().sum() == 1
+    assert df["b"].iloc[-1] == "5"
+
+
+def test_dataframe_with_mixed_object_column(make_backend):
+    backend = make_backend()
+    dataframe = pd.DataFrame({"a": [1, 2], "b": pd.Series([1, "x"], dtype=object)})
+    backend.overwrite_table("db", "t", dataframe)
+    backend.load_dataframe_with_schema_detection("db", dataframe, "loaded")
+    for table_name in ("t", "loaded"):
+        assert _table(backend, table_name)["b"].tolist() == ["1", "x"]
+
+
+def test_ingest_ignores_tables_named_like_locals(make_backend):
+    backend = make_backend()
+    for decoy in ("df", "table_data", "_maximum_agents_ingest"):
+        backend.overwrite_table("db", decoy, [{"a": -1}])
+    backend.overwrite_table("db", "t", [{"a": 0}])
+    backend.add_rows("db", "t", [{"a": 1}])
+    backend.append_data("db", "t", pd.DataFrame({"a": [2]}))
+    backend.load_dataframe_with_schema_detection("db", pd.DataFrame({"a": [3]}), "loaded")
+    assert _table(backend)["a"].tolist() == [0, 1, 2]
+    assert _table(backend, "loaded")["a"].tolist() == [3]
@@ -0,0 +1,22 @@
+from maximum_agents.datastore.types import ColumnMetadataT, DuckDBTypes, ParcelT
+
+
+def test_parcel_columns_take_declared_types(make_backend):
+    backend = make_backend()
+    parcel = ParcelT(
+        table_name="events",
+        parcel_schema={
+            "id": ColumnMetadataT(type=DuckDBTypes.INTEGER),
+            "day": ColumnMetadataT(type=DuckDBTypes.DATE),
+            "code": ColumnMetadataT(type=DuckDBTypes.INTEGER),
+        },
+        rows=[
+            {"id": 1, "day": "2024-01-02", "code": "7"},
+            {"id": 2, "day": None, "code": "not-a-number"},
+        ],
+    )
+    backend.load_parcel("db", parcel)
+    schema = {column["column_name"]: column["data_type"] for column in backend.get_table_schema("db", "events")}
+    # "code" keeps its inferred type because one value does not convert
+    assert schema == {"id": "INTEGER", "day": "DATE", "code": "VARCHAR"}
+    backend.execute_sql("db", "ALTER TABLE events ADD COLUMN note VARCHAR")
@@ -0,0 +1,21 @@
+from maximum_agents.records import CodePartT, OutputPartT, StepT, ThinkingPartT, ToolCallT
+
+
+def test_step_round_trips_part_types():
+    step = StepT(
+        step_number=3,
+        parts=[
+            ThinkingPartT(content="look up the rows"),
+            CodePartT(content="print(1)"),
+            OutputPartT(content="1"),
+            ToolCallT(name="sql_engine", arguments={"query": "SELECT 1", "limit": 5}),
+        ],
+    )
+    restored = StepT.model_validate_json(step.model_dump_json())
+    assert restored == step
+    assert [type(part) for part in restored.parts] == [ThinkingPartT, CodePartT, OutputPartT, ToolCallT]
+
+
+def test_step_parts_dispatch_on_type():
+    step = StepT.model_validate({"parts": [{"type": "output", "content": "done"}, {"type": "code", "content": "x = 1"}]})
+    assert step.parts == [OutputPartT(content="done"), CodePartT(content="x = 1")]
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from maximum_agents.datastore.types import AccessControlT
+
+
+@pytest.fixture
+def single_cursor_backend(make_backend):
+    backend = make_backend(pool_size=1)
+    backend.overwrite_table("db", "t", [{"id": i} for i in range(10)])
+    return backend
+
+
+def _run_with_timeout(func, timeout: float = 10.0):
+    """Run func on a thread so a deadlock fails the test instead of hanging it."""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", func()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "query deadlocked"
+    return result["value"]
+
+
+def test_row_limit_on_single_cursor_pool(single_cursor_backend):
+    access_control = AccessControlT(read_only=False, row_limit=3)
+    df = _run_with_timeout(lambda: single_cursor_backend.execute_sql("db", "SELECT * FROM t -- comment", access_control=access_control))
+    assert len(df) == 3
+
+
+def test_row_limit_batches_on_single_cursor_pool(single_cursor_backend):
+    access_control = AccessControlT(read_only=False, row_limit=4)
+    batches = _run_with_timeout(lambda: list(single_cursor_backend.execute_sql_batches("db", "SELECT * FROM t", access_control=access_control)))
+    assert sum(batch.num_rows for batch in batches) == 4
+
+
+def test_row_limit_applies_to_unwrappable_statements(single_cursor_backend):
+    access_control = AccessControlT(read_only=True, row_limit=2)
+    df = _run_with_timeout(lambda: single_cursor_backend.execute_sql("db", "DESCRIBE t", access_control=access_control))
+    assert len(df) <= 2
+
+
+def test_abandoned_batches_do_not_hold_a_pool_cursor(single_cursor_backend):
+    batches = single_cursor_backend.execute_sql_batches("db", "SELECT * FROM t", rows_per_batch=1)
+    next(batches)
+    # The only pooled cursor is still free while the generator is suspended
+    df = _run_with_timeout(lambda: single_cursor_backend.execute_sql("db", "SELECT count(*) AS n FROM t"))
+    assert df["n"][0] == 10
+    batches.close()
@@ -0,0 +1,19 @@
+import pandas as pd
+
+
+def test_alter_after_load(backend, tmp_path):
+    backend.execute_sql("db", "ALTER TABLE t ADD COLUMN score DOUBLE")
+    backend.execute_sql("db", "ALTER TABLE t ALTER id TYPE VARCHAR")
+    assert backend.get_table_schema("db", "t") == [
+        {"column_name": "id", "data_type": "VARCHAR"},
+        {"column_name": "name", "data_type": "VARCHAR"},
+        {"column_name": "score", "data_type": "DOUBLE"},
+    ]
+
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("id,value\n1,x\n2,y\n")
+    backend.load_csv_with_schema_detection("db", str(csv_path), "from_csv")
+    backend.load_dataframe_with_schema_detection("db", pd.DataFrame({"id": [1, 2]}), "from_df")
+    for table in ("from_csv", "from_df"):
+        backend.execute_sql("db", f"ALTER TABLE {table} ALTER id TYPE BIGINT")
+        backend.execute_sql("db", f"ALTER TABLE {table} ADD COLUMN extra INTEGER")
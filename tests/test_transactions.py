@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from maximum_agents.datastore.types import ColumnMetadataT, DuckDBTypes, ParcelT
+
+
+class Abort(Exception):
+    pass
+
+
+def _load_everything(backend, tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("id,value\n1,x\n")
+    backend.load_csv_with_schema_detection("db", str(csv_path), "from_csv")
+    backend.load_dataframe_with_schema_detection("db", pd.DataFrame({"id": [1]}), "from_df")
+    backend.load_parcel("db", ParcelT(table_name="from_parcel", parcel_schema={"id": ColumnMetadataT(type=DuckDBTypes.INTEGER)}, rows=[{"id": 1}]))
+    backend.overwrite_table("db", "t", [{"id": 9, "name": "z"}])
+    backend.add_row("db", "from_df", {"id": 2})
+
+
+def test_rollback_undoes_loads_and_writes(backend, tmp_path):
+    with pytest.raises(Abort):
+        with backend.transaction("db"):
+            _load_everything(backend, tmp_path)
+            assert backend.get_table_info("db", "from_parcel") is not None
+            raise Abort()
+    assert backend.list_tables("db") == ["t"]
+    assert backend.execute_sql("db", "SELECT id FROM t ORDER BY id")["id"].tolist() == [1, 2]
+
+
+def test_commit_keeps_loads_and_writes(backend, tmp_path):
+    with backend.transaction("db"):
+        _load_everything(backend, tmp_path)
+    assert backend.list_tables("db") == ["from_csv", "from_df", "from_parcel", "t"]
+    assert backend.execute_sql("db", "SELECT id FROM from_df ORDER BY id")["id"].tolist() == [1, 2]
+
+
+def test_single_cursor_pool_transaction(make_backend, tmp_path):
+    backend = make_backend(pool_size=1)
+    backend.overwrite_table("db", "t", [{"id": 1, "name": "a"}])
+    with backend.transaction("db"):
+        _load_everything(backend, tmp_path)
+        assert backend.get_table_info("db", "from_csv").table_name == "from_csv"
+    assert len(backend.list_tables("db")) == 4
+
+
+def test_rollback_keeps_other_threads_buffered_rows(make_backend):
+    # A second cursor, so the other thread is not blocked behind the transaction's one
+    backend = make_backend(pool_size=2, write_batch_size=100, write_max_wait_ms=60_000)
+    backend.overwrite_table("db", "t", [{"id": 1, "name": "a"}])
+    in_transaction = threading.Event()
+    row_buffered = threading.Event()
+
+    def other_thread():
+        in_transaction.wait()
+        backend.add_row("db", "t", {"id": 2, "name": "other thread"})
+        row_buffered.set()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    with pytest.raises(Abort):
+        with backend.transaction("db"):
+            in_transaction.set()
+            row_buffered.wait()
+            backend.flush("db")
+            backend.execute_sql("db", "SELECT * FROM t")
+            raise Abort()
+    thread.join()
+    backend.flush()
+    assert backend.execute_sql("db", "SELECT id FROM t ORDER BY id")["id"].tolist() == [1, 2]
+
+
+def test_background_flush_waits_out_transaction_on_single_cursor(make_backend):
+    backend = make_backend(pool_size=1, write_batch_size=100, write_max_wait_ms=20)
+    backend.overwrite_table("db", "t", [{"id": 1, "name": "a"}])
+    backend.table_exists("db", "t")
+    in_transaction = threading.Event()
+    flush_started = threading.Event()
+
+    def transaction_thread():
+        with backend.transaction("db"):
+            in_transaction.set()
+            flush_started.wait()
+            # The timer's flush is waiting for the cursor this transaction holds
+            backend.execute_sql("db", "SELECT * FROM t")
+            backend.add_row("db", "t", {"id": 3, "name": "in transaction"})
+
+    thread = threading.Thread(target=transaction_thread, daemon=True)
+    thread.start()
+    in_transaction.wait()
+    backend.add_row("db", "t", {"id": 2, "name": "buffered"})
+    time.sleep(0.3)
+    flush_started.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    backend.flush()
+    assert backend.execute_sql("db", "SELECT id FROM t ORDER BY id")["id"].tolist() == [1, 2, 3]